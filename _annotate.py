@@ -0,0 +1,118 @@
+"""
+Summaries of the Cython annotation HTML (cythonize(..., annotate=True)) used by setup.py.
+
+Cython scores every source line by the Python C-API calls in the C code generated for it.
+The summary counts, per function, the body lines with a non zero score. The signature line
+holds the Python wrapper of def/cpdef functions and is not counted.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Sequence
+
+from _build_config import path_as_module_name
+
+LINE_SCORE = re.compile(r'<pre class="cython line score-(\d+)"[^>]*>.*?<span class="">(\d+)</span>:')
+CLASS = re.compile(r"^(\s*)(?:cdef\s+|cpdef\s+)?class\s+(\w+)")
+FUNCTION = re.compile(r"^(\s*)(?:def|cdef|cpdef)\s+(?:[\w\[\]:,.]+\s+\**)*?(\w+)\s*\(")
+
+
+class FunctionSpan(NamedTuple):
+    name: str
+    start: int
+    end: int
+
+
+def line_scores(html: str) -> Dict[int, int]:
+    """
+    source line number -> annotation score
+    """
+    return {int(line): int(score) for score, line in LINE_SCORE.findall(html)}
+
+
+def function_spans(source: str) -> List[FunctionSpan]:
+    """
+    Qualified name and first/last line (1-based, inclusive) of every function in a .pyx source
+    """
+    spans = []
+    scopes = []  # (indent, qualified name, start line, is a function)
+    last = 0
+
+    def close(indent: int):
+        while scopes and scopes[-1][0] >= indent:
+            _, name, start, is_function = scopes.pop()
+            if is_function:
+                spans.append(FunctionSpan(name, start, last))
+
+    for number, line in enumerate(source.splitlines(), start=1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+
+        indent = len(line) - len(line.lstrip())
+        close(indent)
+
+        match = CLASS.match(line) or FUNCTION.match(line)
+        if match:
+            prefix = f"{scopes[-1][1]}." if scopes else ""
+            scopes.append((indent, prefix + match.group(2), number, match.re is FUNCTION))
+
+        last = number
+
+    close(0)
+    return sorted(spans, key=lambda span: span.start)
+
+
+def summarize_module(source: str, html: str) -> dict:
+    """
+    Python interacting lines of a module and of each of its functions
+    """
+    scores = line_scores(html)
+    functions = {}
+
+    for span in function_spans(source):
+        hot = [line for line in range(span.start + 1, span.end + 1) if scores.get(line, 0)]
+        functions[span.name] = {
+            "line": span.start,
+            "python_lines": len(hot),
+            "score": sum(scores[line] for line in hot),
+            "hot_lines": hot,
+        }
+
+    return {
+        "python_lines": sum(1 for score in scores.values() if score),
+        "functions": functions,
+    }
+
+
+def annotation_summary(sources: Sequence[Path]) -> Dict[str, dict]:
+    """
+    module name -> summarize_module of each source with an annotation next to it
+    """
+    summary = {}
+    for source in sources:
+        html = source.with_suffix(".html")
+        if html.exists():
+            summary[path_as_module_name(source)] = summarize_module(source.read_text(), html.read_text())
+    return summary
+
+
+def check_budget(summary: Dict[str, dict], budget: Dict[str, Dict[str, int]]) -> List[str]:
+    """
+    Functions of the budget ({module: {function: max python lines}}) that exceed it or no longer exist
+    """
+    violations = []
+    for module, functions in budget.items():
+        for name, limit in functions.items():
+            result = summary.get(module, {}).get("functions", {}).get(name)
+            if result is None:
+                violations.append(f"{module}.{name}: not found in the annotation")
+            elif result["python_lines"] > limit:
+                lines = ", ".join(str(line) for line in result["hot_lines"])
+                violations.append(f"{module}.{name}: {result['python_lines']} Python interacting lines (budget {limit}), lines {lines}")
+    return violations
+
+
+def load_budget(path: Path) -> Dict[str, Dict[str, int]]:
+    return json.loads(path.read_text())
@@ -0,0 +1,162 @@
+"""
+Extension configuration shared by setup.py and watch.py.
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from setuptools import Extension
+
+src_dir = Path(__file__).parent.joinpath("cython_template")
+
+
+def find_cython_files() -> List[Path]:
+    return sorted(src_dir.rglob("*.pyx"))
+
+
+def path_as_module_name(script_path: Path) -> str:
+    """
+    Convert a path to a module name
+    """
+    return script_path.relative_to(src_dir.parent).with_suffix("").as_posix().replace("/", ".")
+
+
+def openmp_flags() -> List[str]:
+    """
+    Compiler and linker flags enabling OpenMP (cython.parallel.prange), set CYTHON_TEMPLATE_OPENMP=0
+    to build without it. Apple clang has no OpenMP support by default, prange then runs serially.
+    """
+    if os.environ.get("CYTHON_TEMPLATE_OPENMP", "1") in ("", "0"):
+        return []
+    if sys.platform == "win32":
+        return ["/openmp"]
+    if sys.platform == "darwin":
+        return []
+    return ["-fopenmp"]
+
+
+class BuildProfile(NamedTuple):
+    """
+    Cython directives and compiler/linker flags of one kind of build
+    """
+
+    name: str
+    directives: Dict[str, bool]
+    compile_args: List[str]
+    link_args: List[str]
+    define_macros: List[Tuple[str, str]] = []
+
+
+# the hot loops check their own bounds, release builds drop the per access checks
+RELEASE_DIRECTIVES = {"boundscheck": False, "wraparound": False, "cdivision": True, "initializedcheck": False}
+DEBUG_DIRECTIVES = {"boundscheck": True, "wraparound": True, "cdivision": False, "initializedcheck": True}
+
+# cProfile and line profilers only see cython functions compiled with these, see profile_workload.py
+TRACE_DIRECTIVES = {**RELEASE_DIRECTIVES, "profile": True, "linetrace": True, "binding": True}
+TRACE_MACROS = [("CYTHON_TRACE", "1"), ("CYTHON_TRACE_NOGIL", "1")]
+
+
+def build_profiles() -> Dict[str, BuildProfile]:
+    """
+    The build profiles for this platform. release is the default, debug keeps every runtime check and
+    disables optimization, profile is release with debug symbols and frame pointers for native profilers,
+    trace instruments every function and line for cProfile and line profilers (which slows them down a lot).
+
+    Set CYTHON_TEMPLATE_NATIVE=1 to tune release builds for this CPU (-march=native, the extensions
+    may then crash on other machines) and CYTHON_TEMPLATE_LTO=0 to disable link time optimization.
+    """
+    lto = os.environ.get("CYTHON_TEMPLATE_LTO", "1") not in ("", "0")
+    native = os.environ.get("CYTHON_TEMPLATE_NATIVE", "0") not in ("", "0")
+
+    if sys.platform == "win32":
+        release = BuildProfile("release", RELEASE_DIRECTIVES, ["/O2"] + (["/GL"] if lto else []), ["/LTCG"] if lto else [])
+        debug = BuildProfile("debug", DEBUG_DIRECTIVES, ["/Od", "/Zi"], ["/DEBUG"])
+        profile = BuildProfile("profile", RELEASE_DIRECTIVES, ["/O2", "/Zi"], ["/DEBUG"])
+        trace = BuildProfile("trace", TRACE_DIRECTIVES, ["/O2", "/Zi"], ["/DEBUG"], TRACE_MACROS)
+    else:
+        optimize = ["-O3"] + (["-march=native"] if native else [])
+        release = BuildProfile("release", RELEASE_DIRECTIVES, optimize + (["-flto"] if lto else []), ["-flto"] if lto else [])
+        debug = BuildProfile("debug", DEBUG_DIRECTIVES, ["-O0", "-g"], ["-g"])
+        profile = BuildProfile("profile", RELEASE_DIRECTIVES, optimize + ["-g", "-fno-omit-frame-pointer"], ["-g"])
+        trace = BuildProfile("trace", TRACE_DIRECTIVES, optimize + ["-g"], ["-g"], TRACE_MACROS)
+
+    return {p.name: p for p in (release, debug, profile, trace)}
+
+
+def active_profile(name: str = None) -> BuildProfile:
+    """
+    The build profile called name, CYTHON_TEMPLATE_PROFILE when name is not given, release by default
+    """
+    profiles = build_profiles()
+    name = name or os.environ.get("CYTHON_TEMPLATE_PROFILE") or "release"
+    if name not in profiles:
+        raise ValueError(f"unknown build profile {name!r}, expected one of {', '.join(profiles)}")
+    return profiles[name]
+
+
+# extensions with prange loops, only these are compiled and linked with OpenMP
+OPENMP_MODULES = {"cython_template._module2"}
+
+
+def extension_args(profile: BuildProfile, openmp: bool = False) -> Tuple[List[str], List[str]]:
+    """
+    Extra compiler and linker arguments of an extension, with the OpenMP flags when openmp is set
+    """
+    flags = openmp_flags() if openmp else []
+    return flags + profile.compile_args, [f for f in flags if f != "/openmp"] + profile.link_args
+
+
+def make_extension(script_path: Path, profile: BuildProfile = None) -> Extension:
+    profile = profile or active_profile()
+    name = path_as_module_name(script_path)
+    compile_args, link_args = extension_args(profile, openmp=name in OPENMP_MODULES)
+    return Extension(
+        name=name,
+        sources=[str(script_path)],
+        extra_compile_args=compile_args,
+        extra_link_args=link_args,
+        define_macros=list(profile.define_macros),
+    )
+
+
+def cythonize_extensions(extensions: List[Extension], workers: int = 1, profile: BuildProfile = None, **kwargs) -> List[Extension]:
+    """
+    cythonize with the options every build of this package uses
+    """
+    from Cython.Build import cythonize
+
+    profile = profile or active_profile()
+    return cythonize(
+        extensions,
+        language_level="3",
+        compiler_directives=profile.directives,
+        nthreads=workers if workers > 1 else 0,
+        **kwargs,
+    )
+
+
+def build_info(profile: BuildProfile) -> str:
+    """
+    Source of the _build_info module recording how the extensions were built
+    """
+    compile_args, link_args = extension_args(profile)
+    return "\n".join([
+        "# generated by setup.py build_ext, do not edit",
+        f"PROFILE = {profile.name!r}",
+        f"DIRECTIVES = {profile.directives!r}",
+        f"COMPILE_ARGS = {compile_args!r}",
+        f"LINK_ARGS = {link_args!r}",
+        f"OPENMP_ARGS = {openmp_flags()!r}",
+        f"OPENMP_MODULES = {sorted(OPENMP_MODULES)!r}",
+        f"DEFINE_MACROS = {profile.define_macros!r}",
+        "",
+    ])
+
+
+def default_workers() -> int:
+    """
+    Worker count for stub generation and compilation, CYTHON_TEMPLATE_JOBS overrides the CPU count
+    """
+    return max(1, int(os.environ.get("CYTHON_TEMPLATE_JOBS") or os.cpu_count() or 1))
@@ -0,0 +1,336 @@
+## Grammar taken from https://github.com/RaubCamaioni/CythonPEG/blob/main/cython_peg.py
+## with some modifications, see _cython_peg.py for the ParseResults -> stub translation.
+##
+## Building this grammar is a noticeable part of the import time, _cython_peg imports this
+## module on first use.
+
+from pyparsing import *
+import re
+from functools import partial
+from typing import List
+
+# helper functions
+def parentheses_suppress(content: ParserElement) -> ParserElement:
+    return Suppress("(") + Optional(content) + Suppress(")")
+
+def bracket_suppress(content: ParserElement) -> ParserElement:
+    return Suppress("[") + Optional(content) + Suppress("]")
+
+def curl_suppress(content: ParserElement) -> ParserElement:
+    return Suppress("{") + Optional(content) + Suppress("}")
+
+def extend_empty(tokens: List[ParserElement], n: int):
+    if len(tokens) == 0:
+        tokens.extend([""]*n)
+    return tokens
+
+def EmptyDefault(input: ParserElement, n: int=1) -> ParserElement:
+    """returns empty string ParserResult of size n"""
+    return Optional(input).addParseAction(partial(extend_empty, n=n))
+
+def typed_as_python_argument(tokens: ParseResults) -> list:
+    """reorders a cython typed argument (type, name, default) as a python argument (name, type, default)"""
+    arg_type, arg_name, arg_default = tokens
+    return [arg_name.lstrip("*"), arg_type, arg_default]
+
+# literal definitions
+CLASS = Literal("class")
+STRUCT = Literal("struct")
+DEF = Literal("def")
+CPDEF = Literal("cpdef")
+CDEF = Literal("cdef")
+STRUCT = Literal("struct")
+DATACLASS = Literal("dataclass")
+DOT = Suppress('.')
+COMMA = Suppress(',')
+EQUALS = Suppress('=')
+COLON = Suppress(':')
+PLUS = Literal('+')
+MINUS = Literal('-')
+MULT = Literal('*')
+DIV = Literal('/')
+RETURN = Literal("->")
+SELF = Literal("self")
+
+# object definitions
+VARIABLE = Word("_"+alphanums+"_"+"*"+".")
+INTEGER = Word("+-" + nums) + ~FollowedBy(".")
+FLOAT = Combine(Word("+-" + nums) + "." + Word(nums))
+TRUE = Literal("True")
+FALSE = Literal("False")
+NONE = Literal("None")
+STRING = QuotedString(quoteChar="'", unquote_results=False) | QuotedString(quoteChar='"', unquote_results=False)
+ENUM = Word(alphanums + '.' + '_')
+PRIMATIVE = (FLOAT | INTEGER | TRUE | FALSE | NONE | STRING)
+OBJECT = Forward()
+MEMMORYVIEW = Word(":" + nums) + (FollowedBy(Literal(",")) | FollowedBy(Literal("]")))
+LIST = Group(bracket_suppress(delimitedList(OBJECT)))("list")
+TUPLE = Group(parentheses_suppress(delimited_list(OBJECT)))("tuple")
+DICT = Group(curl_suppress(delimitedList(Group(OBJECT + Suppress(":") + OBJECT))))("dict")
+SET = Group(curl_suppress(delimited_list(OBJECT)))("set")
+CLASS_CONSTRUCTOR = Group(VARIABLE+delimited_list(parentheses_suppress(OBJECT)))("class")
+NONPRIMATIVE = (LIST | TUPLE | DICT | SET | ENUM | CLASS_CONSTRUCTOR )
+OBJECT << (NONPRIMATIVE | PRIMATIVE)
+
+# EXPRESSION definition
+EXPRESSION = Forward()
+ATOM = OBJECT | Group(Literal('(') + EXPRESSION + Literal(')'))
+EXPRESSION << infixNotation(ATOM, [(MULT | DIV, 2, opAssoc.LEFT), (PLUS | MINUS, 2, opAssoc.LEFT),])
+
+# IMPORTS
+IMPORT = Keyword("import")
+FROM = Keyword("from")
+CIMPORT = Keyword("cimport")
+import_as_definition = Group(VARIABLE + EmptyDefault(Suppress(Literal("as")) + VARIABLE))
+import_definition = Group(Suppress(IMPORT) + Group(delimited_list(import_as_definition)))("import")
+from_import_defintion = Group(Suppress(FROM) + VARIABLE + Suppress(IMPORT) + Optional(Suppress(Literal('('))) + Group(delimited_list(import_as_definition)) + Optional(Suppress(Literal(')'))))("from")
+import_and_from_import_definition = (from_import_defintion | import_definition)("import")
+import_section = OneOrMore(import_and_from_import_definition)("import_section")
+
+# cimports only exist at compile time, they are matched so they are neither stubbed nor reported as unparsed
+from_cimport_definition = Group(Suppress(FROM) + VARIABLE + Suppress(CIMPORT) + Optional(Suppress(Literal('('))) + Group(delimited_list(import_as_definition)) + Optional(Suppress(Literal(')'))))
+cimport_definition = Group(Suppress(CIMPORT) + Group(delimited_list(import_as_definition)))
+cimport_section = OneOrMore(from_cimport_definition | cimport_definition)("cimport_section")
+
+# default_definition (python and cython)
+# .pxd declarations leave defaults unspecified as "=*", which is stubbed as "= ..."
+UNSPECIFIED_DEFAULT = Literal("*").set_parse_action(replace_with("..."))
+default_definition = (EQUALS + (EXPRESSION | UNSPECIFIED_DEFAULT))("default")
+
+# type definitions (python and cython)
+type_forward = Forward()
+type_bracket = bracket_suppress(delimited_list(type_forward))
+SIGNEDNESS = Keyword("unsigned") | Keyword("signed")
+C_TYPE = Combine(SIGNEDNESS + VARIABLE, join_string=" ", adjacent=False)
+type_definition = Group((C_TYPE | VARIABLE | MEMMORYVIEW) + EmptyDefault(Group(type_bracket)) + EmptyDefault(default_definition + ~Literal(')')))("type")
+type_forward << type_definition
+
+# return definitions
+python_return_definition = Suppress(RETURN) + type_definition
+
+# argument definition
+python_argument_definition = Group(VARIABLE("name") + EmptyDefault(COLON + type_definition, 1) + EmptyDefault(default_definition))("argument")
+CONST = Suppress(Keyword("const"))
+cython_argument_definition = Group((Optional(CONST) + type_definition + VARIABLE("name") + EmptyDefault(default_definition)) | SELF)("arguments")
+
+# def functions in .pyx files may type their arguments the cython way, e.g. def f(self, Py_ssize_t i)
+typed_python_argument_definition = Group((Optional(CONST) + type_definition + VARIABLE + EmptyDefault(default_definition)).add_parse_action(typed_as_python_argument))("argument")
+
+# arguments definition
+python_arguments_definition = parentheses_suppress(delimited_list(typed_python_argument_definition | python_argument_definition))("arguments")
+cython_arguments_definition = parentheses_suppress(delimited_list(cython_argument_definition))("arguments")
+
+class CachedIndentedBlock(IndentedBlock):
+    """IndentedBlock that reuses the block expression built for each indentation column
+
+    IndentedBlock constructs (and streamlines) a fresh expression every time it is parsed,
+    this builds it once per column and matches the same text. Lines are never matched at the
+    end of the input, where rest_of_line would match empty forever (a body-less definition
+    followed only by unindented lines hung IndentedBlock).
+    """
+
+    def __init__(self, expr: ParserElement, *, recursive: bool = False, grouped: bool = True):
+        super().__init__(expr, recursive=recursive, grouped=grouped)
+        self._blocks = {}
+
+    def _block(self, indent_col: int) -> ParserElement:
+        block = self._blocks.get(indent_col)
+        if block is not None:
+            return block
+
+        inner_expr = Empty() + self._Indent(indent_col) + ~StringEnd() + self.expr
+        if self._recursive:
+            nested_block = CachedIndentedBlock(self.expr, recursive=self._recursive, grouped=self._grouped)
+            nested_block.parent_anchor = indent_col
+            inner_expr += Optional(self._IndentGreater(indent_col) + nested_block)
+
+        block = OneOrMore(inner_expr)
+        if self._grouped:
+            block = Group(block)
+        block = block + Optional(self._Indent(self.parent_anchor) | StringEnd())
+        block.streamline()
+
+        self._blocks[indent_col] = block
+        return block
+
+    def parseImpl(self, instring, loc, do_actions=True):
+        anchor_loc = Empty().preParse(instring, loc)
+        if anchor_loc >= len(instring):
+            raise ParseException(instring, anchor_loc, "expected indented block", self)
+        self.expr.try_parse(instring, anchor_loc, do_actions=do_actions)
+        return self._block(col(anchor_loc, instring)).parseImpl(instring, anchor_loc, do_actions)
+
+# recursive definitions 
+recursive_class_definition = Forward()
+recursive_def_definition = Forward()
+recursive_cython_def_definition = Forward()
+recursive_cython_class_definition = Forward()
+recursive_cython_struct_definition = Forward()
+
+# docstring definition
+docstring = QuotedString('"""', multiline=True, escQuote='""""')
+
+# python class definition
+python_class_parent = Word(alphanums+'_'+'.')
+python_class_arguments = parentheses_suppress(python_class_parent)
+python_class_declaration = Group(Suppress(CLASS) + VARIABLE + EmptyDefault(python_class_arguments) + Suppress(":"))("class_declaration")
+python_class_body = CachedIndentedBlock(recursive_class_definition, recursive=True)
+python_class_definition = (python_class_declaration + Optional(docstring, default="") + python_class_body)("class")
+
+# python function definitions
+python_function_declaration = Group(Suppress(DEF) + VARIABLE + Group(python_arguments_definition) + Optional(python_return_definition, "") + Suppress(":"))("def_declaration")
+python_function_body = CachedIndentedBlock(recursive_def_definition, recursive=True)
+python_function_definition = (python_function_declaration + Optional(docstring, default="") + python_function_body)("def")
+
+# cython function definition
+# trailing function modifiers, e.g. "nogil" or "noexcept nogil", joined into a single token
+# noexcept, nogil, except -1, except? -1, except *, except +
+FUNCTION_MODIFIER = VARIABLE | Word("-+?" + nums)
+function_modifiers = Combine(OneOrMore(FUNCTION_MODIFIER), join_string=" ", adjacent=False)
+# the name of a function returning a pointer carries the "*", e.g. "cdef PyObject *name(...)"
+FUNCTION_NAME = VARIABLE.copy().add_parse_action(lambda tokens: tokens[0].lstrip("*"))
+cython_cpdef_function_declaration = Group(Suppress((CPDEF)) + Optional(type_definition + ~cython_arguments_definition, default="") + FUNCTION_NAME + Group(cython_arguments_definition) + Optional(function_modifiers, default="") + Suppress(":"))("cpdef_function_declaration")
+cython_cdef_function_declaration = Group(Suppress(CDEF) + Optional(type_definition + ~cython_arguments_definition, default="") + FUNCTION_NAME + Group(cython_arguments_definition) + Optional(function_modifiers, default="") + Suppress(":"))("cdef_function_declaration")
+cython_function_body = CachedIndentedBlock(recursive_cython_def_definition, recursive=True)
+cython_function_definition = ((python_function_declaration | cython_cpdef_function_declaration | cython_cdef_function_declaration) + Optional(docstring, default="") + cython_function_body)("cdef")
+
+# cython class definition
+# class decorators such as @cython.freelist(8) only change the compiled type
+cython_class_decorators = Suppress(ZeroOrMore(Literal("@") + rest_of_line))
+cython_class_declaration = Group(cython_class_decorators + Suppress(CDEF + CLASS) + VARIABLE +  EmptyDefault(python_class_arguments) + Suppress(":"))("cclass_declaration")
+cython_class_body = CachedIndentedBlock(recursive_cython_class_definition, recursive=True)
+cython_class_definition = (cython_class_declaration + Optional(docstring, default="") + cython_class_body)("cclass")
+
+# cython struct definition
+cython_struct_declaration = Group(Suppress(CDEF + STRUCT) + VARIABLE + Suppress(":"))
+cython_struct_body = CachedIndentedBlock(Group(type_definition + VARIABLE), recursive=True)
+cython_struct_definition = (cython_struct_declaration + Optional(docstring, default="") + cython_struct_body)("cstruct")
+
+# dataclass definition
+dataclass_declaration = (Suppress(Literal("@") + DATACLASS + CLASS) + VARIABLE + Suppress(":"))
+dataclass_body = CachedIndentedBlock(rest_of_line, recursive=True)
+dataclass_definition = (dataclass_declaration + Optional(docstring, default="") + dataclass_body)("dataclass")
+
+# cdef extern blocks declare C for the compiler only, they are matched so they are neither stubbed nor reported as unparsed
+cython_extern_declaration = Suppress(CDEF + Keyword("extern") + rest_of_line)
+cython_extern_definition = (cython_extern_declaration + CachedIndentedBlock(rest_of_line, recursive=True))("cextern")
+
+# module level names bound to a literal are stubbed with the type of the literal, e.g. "LIMIT = 32" as "LIMIT: int"
+IDENTIFIER = Word(identchars, identbodychars)
+line_end = Suppress(Optional(python_style_comment.copy().set_whitespace_chars(" \t")) + LineEnd())
+module_constant_definition = (AtLineStart(IDENTIFIER) + EQUALS + PRIMATIVE + line_end)("constant")
+
+# module level cdef variables only exist in C, they are matched so they are neither stubbed nor reported as unparsed
+# the declaration ends at the line end, names must not run into the next line
+LINE_VARIABLE = VARIABLE.copy().set_whitespace_chars(" \t")
+line_names = LINE_VARIABLE + ZeroOrMore(Suppress(Literal(",").set_whitespace_chars(" \t")) + LINE_VARIABLE)
+line_value = Suppress(Literal("=").set_whitespace_chars(" \t") + rest_of_line)
+cython_variable_definition = Group(AtLineStart(CDEF) + ~(CLASS | STRUCT | Keyword("extern")) + Optional(CONST) + type_definition + line_names + (line_value | line_end))("cvariable")
+
+# decorators in class bodies, the renderer keeps the ones that change how a method is called (e.g. @property)
+decorator = Group(Suppress(Literal("@")) + rest_of_line)("decorator")
+
+# recursive definitions (could be individually assigned for parsing performance improvements: i.e cython_class never defined inside python_function)
+definitions = (python_class_definition | python_function_definition | cython_function_definition | cython_class_definition | cython_struct_definition | decorator | restOfLine)
+recursive_class_definition         << definitions
+recursive_def_definition           << definitions
+recursive_cython_def_definition    << definitions
+recursive_cython_class_definition  << definitions
+recursive_cython_struct_definition << definitions
+
+# full recursive definition
+cython_parser = python_class_definition | python_function_definition | cython_function_definition | cython_class_definition | cython_struct_definition | dataclass_definition | cython_extern_definition | import_section | cimport_section | module_constant_definition | cython_variable_definition
+
+# optimized definitions, each body only tries the definitions that can appear (and are rendered) in its context:
+# function bodies hold nested classes and functions, class bodies never hold cdef classes or structs,
+# cdef class bodies hold def/cpdef/cdef methods. Everything else falls through to restOfLine, which keeps
+# the extent of each block (and so the generated stub) identical to cython_parser.
+optimized_recursive_class_definition = Forward()
+optimized_recursive_def_definition = Forward()
+optimized_recursive_cython_class_definition = Forward()
+
+optimized_python_class_definition = (python_class_declaration + Optional(docstring, default="") + CachedIndentedBlock(optimized_recursive_class_definition, recursive=True))("class")
+optimized_python_function_definition = (python_function_declaration + Optional(docstring, default="") + CachedIndentedBlock(optimized_recursive_def_definition, recursive=True))("def")
+optimized_cython_function_definition = ((python_function_declaration | cython_cpdef_function_declaration | cython_cdef_function_declaration) + Optional(docstring, default="") + CachedIndentedBlock(optimized_recursive_def_definition, recursive=True))("cdef")
+optimized_cython_class_definition = (cython_class_declaration + Optional(docstring, default="") + CachedIndentedBlock(optimized_recursive_cython_class_definition, recursive=True))("cclass")
+
+optimized_recursive_class_definition        << (optimized_python_class_definition | optimized_python_function_definition | decorator | restOfLine)
+optimized_recursive_def_definition          << (optimized_python_class_definition | optimized_python_function_definition | restOfLine)
+optimized_recursive_cython_class_definition << (optimized_python_function_definition | optimized_cython_function_definition | optimized_cython_class_definition | decorator | restOfLine)
+
+optimized_cython_parser = optimized_python_class_definition | optimized_python_function_definition | optimized_cython_function_definition | optimized_cython_class_definition | cython_struct_definition | dataclass_definition | cython_extern_definition | import_section | cimport_section | module_constant_definition | cython_variable_definition
+
+class SkippedBlock(Token):
+    """Matches the same text as IndentedBlock(restOfLine, recursive=True) without parsing it
+
+    Only the indentation of each line is looked at, so the cost of skipping a block
+    scales with its number of lines rather than with the grammar.
+    """
+
+    _whitespace = re.compile(r"[ \t\r\n]*")
+
+    def __init__(self):
+        super().__init__()
+        self.mayReturnEmpty = True
+        self.errmsg = "expected indented block"
+
+    def parseImpl(self, instring, loc, do_actions=True):
+        end = len(instring)
+        if loc >= end:
+            raise ParseException(instring, loc, self.errmsg, self)
+
+        def line_end(loc: int) -> int:
+            nl = instring.find("\n", loc)
+            return end if nl < 0 else nl
+
+        indents = [col(loc, instring)]
+        last = line_end(loc)
+
+        while True:
+            loc = self._whitespace.match(instring, last).end()
+            if loc >= end:
+                break
+
+            indent = col(loc, instring)
+            if indent > indents[-1]:
+                indents.append(indent)
+            else:
+                while len(indents) > 1 and indents[-1] > indent:
+                    indents.pop()
+                if indents[-1] != indent:
+                    break
+
+            last = line_end(loc)
+
+        # IndentedBlock also consumes the whitespace up to a following top level line
+        if loc >= end or col(loc, instring) == 1:
+            return loc, [""]
+        return last, [""]
+
+# fast definitions, function bodies are skipped by indentation as stubs never render them,
+# only class bodies are descended into
+fast_recursive_class_definition = Forward()
+fast_recursive_cython_class_definition = Forward()
+
+fast_python_class_definition = (python_class_declaration + Optional(docstring, default="") + CachedIndentedBlock(fast_recursive_class_definition, recursive=True))("class")
+fast_python_function_definition = (python_function_declaration + Optional(docstring, default="") + SkippedBlock())("def")
+fast_cython_function_definition = ((python_function_declaration | cython_cpdef_function_declaration | cython_cdef_function_declaration) + Optional(docstring, default="") + SkippedBlock())("cdef")
+fast_cython_class_definition = (cython_class_declaration + Optional(docstring, default="") + CachedIndentedBlock(fast_recursive_cython_class_definition, recursive=True))("cclass")
+
+fast_recursive_class_definition        << (fast_python_class_definition | fast_python_function_definition | decorator | restOfLine)
+fast_recursive_cython_class_definition << (fast_python_function_definition | fast_cython_function_definition | fast_cython_class_definition | decorator | restOfLine)
+
+fast_cython_extern_definition = (cython_extern_declaration + SkippedBlock())("cextern")
+fast_cython_parser = fast_python_class_definition | fast_python_function_definition | fast_cython_function_definition | fast_cython_class_definition | cython_struct_definition | dataclass_definition | fast_cython_extern_definition | import_section | cimport_section | module_constant_definition | cython_variable_definition
+
+# pxd declarations, only what a stub needs: cpdef signatures and public/readonly attributes of cdef classes.
+# .pxd declarations have no trailing colon, so the function modifiers must stay on the declaration line
+# declarations end at the line end, modifiers must not run into the next line
+PXD_FUNCTION_MODIFIER = (VARIABLE.copy().set_whitespace_chars(" \t") | Word("-+?" + nums).set_whitespace_chars(" \t")).set_whitespace_chars(" \t")
+pxd_function_modifiers = Combine(OneOrMore(PXD_FUNCTION_MODIFIER), join_string=" ", adjacent=False)
+pxd_cpdef_function_declaration = Group(Suppress(CPDEF) + Optional(type_definition + ~cython_arguments_definition, default="") + VARIABLE + Group(cython_arguments_definition) + Optional(pxd_function_modifiers, default=""))("cpdef_function_declaration")
+pxd_attribute_declaration = Group(Suppress(CDEF) + (Literal("public") | Literal("readonly")) + type_definition + Group(delimited_list(VARIABLE)))("attribute_declaration")
+pxd_class_body = CachedIndentedBlock(pxd_attribute_declaration | pxd_cpdef_function_declaration | restOfLine, recursive=True)
+pxd_class_definition = (cython_class_declaration + Optional(docstring, default="") + pxd_class_body)("pxd_cclass")
+
+pxd_parser = pxd_class_definition | pxd_cpdef_function_declaration
@@ -3,13 +3,31 @@
 ## and fixing nested docstrings.
 
 from pyparsing import *
+import os
+import re
 import textwrap
-from functools import partial
-from typing import Union, List, IO, Tuple, Callable
+from typing import Union, List, IO, Tuple, Callable, Iterable, Iterator, NamedTuple, Dict
+
+# C types and the Python type they convert to, memoryviews become BUFFER_TYPE
+C_TYPES = {
+    **dict.fromkeys(["char", "short", "int", "long", "Py_ssize_t", "Py_hash_t", "size_t", "ssize_t", "ptrdiff_t"], "int"),
+    **dict.fromkeys([f"{sign}int{bits}_t" for sign in ("", "u") for bits in (8, 16, 32, 64)], "int"),
+    **dict.fromkeys(["float", "double"], "float"),
+    **dict.fromkeys(["char*", "const char*"], "bytes"),
+    "Py_UCS4": "str",
+    "bint": "bool",
+    "void": "None",
+}
+
+# any object exporting the buffer protocol, typing_extensions is known to every type checker
+BUFFER_TYPE = "Buffer"
+BUFFER_IMPORT = "from typing_extensions import Buffer\n"
+BUFFER_ANNOTATION = re.compile(rf"(?::|->) {BUFFER_TYPE}\b")
 
 def partial_cython_2_python(type_str: str) -> str:
-    """partial type component"""
-    return type_str
+    """partial type component, C types become their Python equivalent"""
+    name = type_str.split(" ", 1)[1] if type_str.startswith(("signed ", "unsigned ")) else type_str
+    return C_TYPES.get(name, type_str)
 
 def complete_cython_2_python(type_str: str) -> str:
     """complete type component"""
@@ -30,151 +48,18 @@ def set_type_converter_complete(func: Callable[[str], str]):
     global complete_cython_2_python
     complete_cython_2_python = func
 
-# helper functions
-def parentheses_suppress(content: ParserElement) -> ParserElement:
-    return Suppress("(") + Optional(content) + Suppress(")")
-
-def bracket_suppress(content: ParserElement) -> ParserElement:
-    return Suppress("[") + Optional(content) + Suppress("]")
-
-def curl_suppress(content: ParserElement) -> ParserElement:
-    return Suppress("{") + Optional(content) + Suppress("}")
-
-def extend_empty(tokens: List[ParserElement], n: int):
-    if len(tokens) == 0:
-        tokens.extend([""]*n)
-    return tokens
-
-def EmptyDefault(input: ParserElement, n: int=1) -> ParserElement:
-    """returns empty string ParserResult of size n"""
-    return Optional(input).addParseAction(partial(extend_empty, n=n))
-
-# literal definitions
-CLASS = Literal("class")
-STRUCT = Literal("struct")
-DEF = Literal("def")
-CPDEF = Literal("cpdef")
-CDEF = Literal("cdef")
-STRUCT = Literal("struct")
-DATACLASS = Literal("dataclass")
-DOT = Suppress('.')
-COMMA = Suppress(',')
-EQUALS = Suppress('=')
-COLON = Suppress(':')
-PLUS = Literal('+')
-MINUS = Literal('-')
-MULT = Literal('*')
-DIV = Literal('/')
-RETURN = Literal("->")
-SELF = Literal("self")
-
-# object definitions
-VARIABLE = Word("_"+alphanums+"_"+"*"+".")
-INTEGER = Word("+-" + nums) + ~FollowedBy(".")
-FLOAT = Combine(Word("+-" + nums) + "." + Word(nums))
-TRUE = Literal("True")
-FALSE = Literal("False")
-NONE = Literal("None")
-STRING = QuotedString(quoteChar="'", unquote_results=False) | QuotedString(quoteChar='"', unquote_results=False)
-ENUM = Word(alphanums + '.' + '_')
-PRIMATIVE = (FLOAT | INTEGER | TRUE | FALSE | NONE | STRING)
-OBJECT = Forward()
-MEMMORYVIEW = Word(":" + nums) + (FollowedBy(Literal(",")) | FollowedBy(Literal("]")))
-LIST = Group(bracket_suppress(delimitedList(OBJECT)))("list")
-TUPLE = Group(parentheses_suppress(delimited_list(OBJECT)))("tuple")
-DICT = Group(curl_suppress(delimitedList(Group(OBJECT + Suppress(":") + OBJECT))))("dict")
-SET = Group(curl_suppress(delimited_list(OBJECT)))("set")
-CLASS_CONSTRUCTOR = Group(VARIABLE+delimited_list(parentheses_suppress(OBJECT)))("class")
-NONPRIMATIVE = (LIST | TUPLE | DICT | SET | ENUM | CLASS_CONSTRUCTOR )
-OBJECT << (NONPRIMATIVE | PRIMATIVE)
-
-# EXPRESSION definition
-EXPRESSION = Forward()
-ATOM = OBJECT | Group(Literal('(') + EXPRESSION + Literal(')'))
-EXPRESSION << infixNotation(ATOM, [(MULT | DIV, 2, opAssoc.LEFT), (PLUS | MINUS, 2, opAssoc.LEFT),])
-
-# IMPORTS
-IMPORT = Literal("import")
-FROM = Literal("from")
-import_as_definition = Group(VARIABLE + EmptyDefault(Suppress(Literal("as")) + VARIABLE))
-import_definition = Group(Suppress(IMPORT) + Group(delimited_list(import_as_definition)))("import")
-from_import_defintion = Group(Suppress(FROM) + VARIABLE + Suppress(IMPORT) + Optional(Suppress(Literal('('))) + Group(delimited_list(import_as_definition)) + Optional(Suppress(Literal(')'))))("from")
-import_and_from_import_definition = (from_import_defintion | import_definition)("import")
-import_section = OneOrMore(import_and_from_import_definition)("import_section")
-
-# default_definition (python and cython)
-default_definition = (EQUALS + EXPRESSION)("default")
-
-# type definitions (python and cython)
-type_forward = Forward()
-type_bracket = bracket_suppress(delimited_list(type_forward))
-type_definition = Group((VARIABLE | MEMMORYVIEW) + EmptyDefault(Group(type_bracket)) + EmptyDefault(default_definition + ~Literal(')')))("type")
-type_forward << type_definition
-
-# return definitions
-python_return_definition = Suppress(RETURN) + type_definition
-
-# argument definition
-python_argument_definition = Group(VARIABLE("name") + EmptyDefault(COLON + type_definition, 1) + EmptyDefault(default_definition))("argument")
-cython_argument_definition = Group((type_definition + VARIABLE("name") + EmptyDefault(default_definition)) | SELF)("arguments")
-
-# arguments definition
-python_arguments_definition = parentheses_suppress(delimited_list(python_argument_definition))("arguments")
-cython_arguments_definition = parentheses_suppress(delimited_list(cython_argument_definition))("arguments")
-
-# recursive definitions 
-recursive_class_definition = Forward()
-recursive_def_definition = Forward()
-recursive_cython_def_definition = Forward()
-recursive_cython_class_definition = Forward()
-recursive_cython_struct_definition = Forward()
-
-# docstring definition
-docstring = QuotedString('"""', multiline=True, escQuote='""""')
-
-# python class definition
-python_class_parent = Word(alphanums+'_'+'.')
-python_class_arguments = parentheses_suppress(python_class_parent)
-python_class_declaration = Group(Suppress(CLASS) + VARIABLE + EmptyDefault(python_class_arguments) + Suppress(":"))("class_declaration")
-python_class_body = IndentedBlock(recursive_class_definition, recursive=True)
-python_class_definition = (python_class_declaration + Optional(docstring, default="") + python_class_body)("class")
-
-# python function definitions
-python_function_declaration = Group(Suppress(DEF) + VARIABLE + Group(python_arguments_definition) + Optional(python_return_definition, "") + Suppress(":"))("def_declaration")
-python_function_body = IndentedBlock(recursive_def_definition, recursive=True)
-python_function_definition = (python_function_declaration + Optional(docstring, default="") + python_function_body)("def")
-
-# cython function definition
-cython_cpdef_function_declaration = Group(Suppress((CPDEF)) + Optional(type_definition + ~cython_arguments_definition, default="") + VARIABLE + Group(cython_arguments_definition) + Optional(VARIABLE, default="") + Suppress(":"))("cpdef_function_declaration")
-cython_cdef_function_declaration = Group(Suppress(CDEF) + Optional(type_definition + ~cython_arguments_definition, default="") + VARIABLE + Group(cython_arguments_definition) + Optional(VARIABLE, default="") + Suppress(":"))("cdef_function_declaration")
-cython_function_body = IndentedBlock(recursive_cython_def_definition, recursive=True)
-cython_function_definition = ((python_function_declaration | cython_cpdef_function_declaration | cython_cdef_function_declaration) + Optional(docstring, default="") + cython_function_body)("cdef")
-
-# cython class definition
-cython_class_declaration = Group(Suppress(CDEF + CLASS) + VARIABLE +  EmptyDefault(python_class_arguments) + Suppress(":"))("cclass_declaration")
-cython_class_body = IndentedBlock(recursive_cython_class_definition, recursive=True)
-cython_class_definition = (cython_class_declaration + Optional(docstring, default="") + cython_class_body)("cclass")
-
-# cython struct definition
-cython_struct_declaration = Group(Suppress(CDEF + STRUCT) + VARIABLE + Suppress(":"))
-cython_struct_body = IndentedBlock(Group(type_definition + VARIABLE), recursive=True)
-cython_struct_definition = (cython_struct_declaration + Optional(docstring, default="") + cython_struct_body)("cstruct")
-
-# dataclass definition
-dataclass_declaration = (Suppress(Literal("@") + DATACLASS + CLASS) + VARIABLE + Suppress(":"))
-dataclass_body = IndentedBlock(rest_of_line, recursive=True)
-dataclass_definition = (dataclass_declaration + Optional(docstring, default="") + dataclass_body)("dataclass")
-
-# recursive definitions (could be individually assigned for parsing performance improvements: i.e cython_class never defined inside python_function)
-definitions = (python_class_definition | python_function_definition | cython_function_definition | cython_class_definition | cython_struct_definition | restOfLine)
-recursive_class_definition         << definitions
-recursive_def_definition           << definitions
-recursive_cython_def_definition    << definitions
-recursive_cython_class_definition  << definitions
-recursive_cython_struct_definition << definitions
-
-# full recursive definition
-cython_parser = python_class_definition | python_function_definition | cython_function_definition | cython_class_definition | cython_struct_definition | dataclass_definition | import_section
+def _grammar():
+    """the pyparsing grammar module, built on first use and reused afterwards"""
+    import _cython_grammar
+    return _cython_grammar
+
+def __getattr__(name: str):
+    # the grammar elements used to be defined here, keep them importable from this module
+    if not name.startswith("__"):
+        grammar = _grammar()
+        if hasattr(grammar, name):
+            return getattr(grammar, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def expression2str(expression: Union[ParseResults, str]):
     """EXPRESSION parsed tree to string"""
@@ -202,22 +87,37 @@ def expression2str(expression: Union[ParseResults, str]):
     elif isinstance(expression, str):
         return expression
 
-def type2str(type_tree: ParseResults):
-    """type_definition parsed tree to string"""
+def is_memoryview(type_bracket: ParseResults) -> bool:
+    """whether the brackets of a type are memoryview slices, e.g. int[:] or double[:, ::1]"""
+    return bool(type_bracket) and all(isinstance(arg, ParseResults) and arg[0].startswith(":") for arg in type_bracket)
+
+def optional2str(type_str: str, default: Union[ParseResults, str]) -> str:
+    """a None default makes the argument type optional"""
+    if type_str and default == "None" and type_str != "None" and not type_str.endswith("| None"):
+        return f"{type_str} | None"
+    return type_str
+
+def type2str(type_tree: ParseResults, default: bool = True):
+    """type_definition parsed tree to string
+
+    the grammar may attach the default of an argument to its type, default=False leaves it out
+    """
     
-    def _type2_str(type_tree: ParseResults):
+    def _type2_str(type_tree: ParseResults, default: bool):
         type_name, type_bracket, type_default = type_tree
-        
+        type_default_str = f'={expression2str(type_default)}' if type_default and default else ''
+
+        if is_memoryview(type_bracket):
+            return f"{BUFFER_TYPE}{type_default_str}"
+
         if type_bracket:
-            bracket_str = "["+", ".join(_type2_str(arg) for arg in type_bracket)+"]" if type_bracket else ""
+            bracket_str = "["+", ".join(_type2_str(arg, True) for arg in type_bracket)+"]" if type_bracket else ""
         else:
             bracket_str = ""
-            
-        type_default_str = f'={expression2str(type_default)}' if type_default else ''
         
         return f"{partial_cython_2_python(type_name)}{bracket_str}{type_default_str}"
     
-    return complete_cython_2_python(_type2_str(type_tree))
+    return complete_cython_2_python(_type2_str(type_tree, default))
 
 def arg2str(arg: ParseResults):
     """python_argument_definition parsed tree to string"""
@@ -225,10 +125,12 @@ def arg2str(arg: ParseResults):
     arg_name, arg_type, arg_default = arg
 
     if isinstance(arg_type, ParseResults):
-        type_str = type2str(arg_type)
+        type_str = type2str(arg_type, default=False)
+        arg_default = arg_default or arg_type[2]
     else:
         type_str = ""
 
+    type_str = optional2str(type_str, arg_default)
     type_str = f': {type_str}' if type_str else ''
     arg_default_str = f'={expression2str(arg_default)}' if arg_default else ''
 
@@ -239,15 +141,16 @@ def args2str(args: ParseResults, newlines: bool=False):
     joiner = f',\n{INDENT}' if newlines else ', '
     return joiner.join(arg2str(arg) for arg in args)
 
-def def2str(result: ParseResults):
-    """function_definition parsed tree to string"""
+def def2str(result: ParseResults, name: str = None, decorators: List[str] = ()):
+    """function_definition parsed tree to string, name renames the function"""
     
     declaration, docs, _ = result
-    name, args, ret = declaration
+    declared_name, args, ret = declaration
+    name = name or declared_name
 
     docs = textwrap.indent(textwrap.dedent(docs), INDENT)
             
-    return_str = type2str(ret) if ret else ""
+    return_str = type2str(ret) if ret else ("None" if name == "__init__" else "")
     return_str = f" -> {return_str}" if return_str else ''
     doc_str = f'\n{INDENT}\"""{docs}{INDENT}\"""' if docs else ''
     
@@ -255,7 +158,8 @@ def def2str(result: ParseResults):
     if len(arg_str) > 100:
         arg_str = args2str(args, newlines=True)
 
-    return f"def {name}({arg_str}){return_str}:{doc_str}\n{INDENT}...\n"
+    decorator_str = "".join(f"@{decorator}\n" for decorator in decorators)
+    return f"{decorator_str}def {name}({arg_str}){return_str}:{doc_str}\n{INDENT}...\n"
 
 def cythonargs2str(args: ParseResults, newlines: bool=False):
     """cython_arguments_definition parsed tree to string"""
@@ -263,7 +167,8 @@ def cythonargs2str(args: ParseResults, newlines: bool=False):
     def format_arg(arg):
         if arg[0] == "self": return "self" # handle unique case cdef inside class
         t, n, d = arg
-        type_str = type2str(t)
+        d = d or t[2]
+        type_str = optional2str(type2str(t, default=False), d)
         default_str = f' = {expression2str(d)}' if d else ''
         return f'{n}: {type_str}{default_str}'
 
@@ -285,6 +190,20 @@ def cdef2str(result: ParseResults):
         arg_str = cythonargs2str(args, newlines=True)
     return f"def {name}({arg_str}){ret_str}:{doc_str}\n{INDENT}..." + '\n'
 
+# decorators that change how a method is called, the others only change its implementation
+STUB_DECORATORS = ("property", "staticmethod", "classmethod")
+STUB_DECORATOR_SUFFIXES = (".setter", ".getter", ".deleter")
+
+def decorators_before(body: ParseResults, i: int) -> List[str]:
+    """the stub relevant decorators of the declaration at body[i]"""
+    decorators = []
+    while i > 0 and isinstance(body[i-1], ParseResults) and body[i-1].getName() == "decorator":
+        i -= 1
+        decorator = body[i][0].strip()
+        if decorator in STUB_DECORATORS or decorator.endswith(STUB_DECORATOR_SUFFIXES):
+            decorators.insert(0, decorator)
+    return decorators
+
 def enum2str(result: ParseResults):
     """python_class_definition parsed tree to string (enum)"""
     
@@ -325,7 +244,7 @@ def class2str(result: ParseResults):
 
         elif parser_name == "def_declaration":
             result = (b, body[i+1], body[i+2])
-            element_string.append(textwrap.indent(def2str(result), INDENT))
+            element_string.append(textwrap.indent(def2str(result, decorators=decorators_before(body, i)), INDENT))
     
     if not len(element_string):
         class_str += f"{INDENT}...\n"
@@ -351,8 +270,58 @@ def struct2str(result):
     
     return class_str + "\n".join(element_string) + '\n'
 
-def cclass2str(result: ParseResults):
-    """cython_class_definition parsed tree to string"""
+def attribute2str(declaration: ParseResults):
+    """pxd_attribute_declaration parsed tree to string, readonly attributes become properties"""
+    access, type_tree, names = declaration
+    type_str = type2str(type_tree)
+
+    if access == "readonly":
+        return "\n".join(f"@property\ndef {name}(self) -> {type_str}:\n{INDENT}...\n" for name in names)
+    return "".join(f"{name}: {type_str}\n" for name in names)
+
+class PxdClass(NamedTuple):
+    """public declarations of a cdef class in a .pxd file"""
+    attributes: List[ParseResults]
+    methods: Dict[str, ParseResults]
+
+class PxdDeclarations(NamedTuple):
+    """public declarations of a .pxd file, by name"""
+    functions: Dict[str, ParseResults]
+    classes: Dict[str, PxdClass]
+
+def pxd_declarations(pxd_code: str) -> PxdDeclarations:
+    """cpdef signatures and public/readonly cdef class attributes declared in pxd_code"""
+    functions, classes = {}, {}
+
+    for result, _, _ in _grammar().pxd_parser.scan_string((pxd_code + "\n").expandtabs()):
+        if result.getName() == "pxd_cclass":
+            declaration, _, body = result
+            members = [b for b in body if isinstance(b, ParseResults)]
+            classes[declaration[0]] = PxdClass(
+                [b for b in members if b.getName() == "attribute_declaration"],
+                {b[1]: b for b in members if b.getName() == "cpdef_function_declaration"},
+            )
+        else:
+            functions[result[0][1]] = result[0]
+
+    return PxdDeclarations(functions, classes)
+
+def pxd_signature(declaration: ParseResults, implementation: ParseResults) -> ParseResults:
+    """pxd cpdef declaration with its unspecified ("=*") defaults taken from the .pyx implementation"""
+    defaults = {arg[1]: arg[2] for arg in implementation[2] if len(arg) == 3}
+    for arg in declaration[2]:
+        if len(arg) == 3 and arg[2] == "...":
+            arg[2] = defaults.get(arg[1], arg[2])
+    return declaration
+
+# special methods of cdef classes that are only called from C
+C_SPECIAL_METHODS = {"__dealloc__", "__getbuffer__", "__releasebuffer__"}
+
+def cclass2str(result: ParseResults, pxd_class: PxdClass = None):
+    """cython_class_definition parsed tree to string
+
+    pxd_class adds the attributes and replaces the cpdef signatures declared in the .pxd
+    """
     
     declaration, docs, body = result
     name, parent = declaration
@@ -362,6 +331,13 @@ def cclass2str(result: ParseResults):
     class_str += f"class {name}{f'({parent})' if parent else ''}:{doc_str}\n\n"
 
     element_string = []
+    if pxd_class is not None:
+        element_string.extend(textwrap.indent(attribute2str(a), INDENT) for a in pxd_class.attributes)
+
+    # __cinit__ takes the constructor arguments unless the class defines __init__
+    methods = {b[0] for b in body if isinstance(b, ParseResults) and b.getName() == "def_declaration"}
+    skipped_methods = C_SPECIAL_METHODS | ({"__cinit__"} if "__init__" in methods else set())
+
     for i, b in enumerate(body):
 
         if not isinstance(b, ParseResults):
@@ -372,11 +348,15 @@ def cclass2str(result: ParseResults):
             result = (b, body[i+1], body[i+2])
             element_string.append(textwrap.indent(cclass2str(result), INDENT))
         elif parser_name == "cpdef_function_declaration":
-            result = (b, body[i+1], body[i+2])
+            signature = b
+            if pxd_class is not None and b[1] in pxd_class.methods:
+                signature = pxd_signature(pxd_class.methods[b[1]], b)
+            result = (signature, body[i+1], body[i+2])
             element_string.append(textwrap.indent(cdef2str(result), INDENT))
-        elif parser_name == "def_declaration":
+        elif parser_name == "def_declaration" and b[0] not in skipped_methods:
             result = (b, body[i+1], body[i+2])
-            element_string.append(textwrap.indent(def2str(result), INDENT))
+            name = "__init__" if b[0] == "__cinit__" else None
+            element_string.append(textwrap.indent(def2str(result, name, decorators_before(body, i)), INDENT))
     
     if not len(element_string):
         class_str += f"{INDENT}...\n"
@@ -426,6 +406,19 @@ def dataclass2str(result: ParseResults):
     dataclass_str += textwrap.indent(recursive_body(body), INDENT)
     return dataclass_str
 
+def constant2str(result: ParseResults):
+    """module_constant_definition parsed tree to string, annotated with the type of its literal"""
+    name, value = result
+    if value in ("True", "False"):
+        value_type = "bool"
+    elif value == "None":
+        value_type = "None"
+    elif value[:1] in ("'", '"'):
+        value_type = "str"
+    else:
+        value_type = "float" if "." in value else "int"
+    return f"{name}: {value_type}\n"
+
 def unimplimented2str(result: ParseResults):
     return ""
 
@@ -442,14 +435,58 @@ def recursive_body(body: ParseResults):
             
     return '\n'.join(element_string) + '\n'
     
-def cython_string_2_stub(input_code: str) -> Tuple[str, str]:
-    """tree traversal and translation of ParseResults to string representation"""
-    
-    # indentblock needs newline as sentinal
-    input_code += "\n"
+class UnparsedRegion(NamedTuple):
+    """input text not matched by the grammar, line and column are 1-based"""
+    start: int
+    end: int
+    line: int
+    column: int
+    text: str
+
+def parsed_gaps(length: int, spans: Iterable[Tuple[int, int]]) -> Iterator[Tuple[int, int]]:
+    """(start, end) gaps left in range(length) by the merged spans"""
+    position = 0
+    for start, end in sorted(spans):
+        if start > position:
+            yield position, start
+        position = max(position, end)
+    if position < length:
+        yield position, length
+
+def unparsed_regions(input_code: str, spans: Iterable[Tuple[int, int]]) -> List[UnparsedRegion]:
+    """gaps between the parsed spans that hold anything but whitespace and comments"""
+    regions = []
+    line, line_start = 1, 0
+
+    for gap_start, gap_end in parsed_gaps(len(input_code), spans):
+        text = input_code[gap_start:gap_end].lstrip()
+        if all(not l.strip() or l.lstrip().startswith("#") for l in text.splitlines()):
+            continue
+
+        start = gap_end - len(text)
+        text = text.rstrip()
+
+        line += input_code.count("\n", line_start, start)
+        line_start = start
+        regions.append(UnparsedRegion(start, start + len(text), line, col(start, input_code), text))
+
+    return regions
+
+def _iter_stub(input_code: str, optimized: bool, fast: bool, renderers: Dict[str, Callable] = None) -> Iterator[Tuple[str, int, int]]:
+    """stub fragment and parsed span of each match, input_code must already be tab expanded
+
+    renderers overrides the ParseResults -> string function for a result name
+    """
     
+    if fast:
+        grammar = _grammar().fast_cython_parser
+    elif optimized:
+        grammar = _grammar().optimized_cython_parser
+    else:
+        grammar = _grammar().cython_parser
+
     # PEG top down scan generator
-    tree = cython_parser.scan_string(input_code)
+    tree = grammar.scan_string(input_code)
     
     # 3.8+ compatible switch
     parser = {
@@ -460,25 +497,187 @@ def cython_string_2_stub(input_code: str) -> Tuple[str, str]:
         "class": class2str,
         "dataclass": dataclass2str,
         "import_section": import_section2str,
+        "constant": constant2str,
+        **(renderers or {}),
     }
     
     # ParseResults -> Python Stub Element
-    def parse_branch(branch: Tuple[ParseResults, int, int]):
-        result, start, end = branch
-        return parser.get(result.getName(), unimplimented2str)(result), start, end
-    tree_str, start, end = zip(*[parse_branch(b) for b in tree])
+    for result, start, end in tree:
+        yield parser.get(result.getName(), unimplimented2str)(result), start, end
+
+def with_stub_imports(fragments: List[str]) -> List[str]:
+    """stub fragments with the import of BUFFER_TYPE after the leading imports, when it is used"""
+    if not any(BUFFER_ANNOTATION.search(fragment) for fragment in fragments):
+        return fragments
+    position = 0
+    while position < len(fragments) and fragments[position].startswith(("import ", "from ")):
+        position += 1
+    return fragments[:position] + [BUFFER_IMPORT] + fragments[position:]
+
+def iter_with_stub_imports(fragments: Iterable[str]) -> Iterator[str]:
+    """stub fragments with the import of BUFFER_TYPE before the first fragment annotated with it"""
+    imported = False
+    for fragment in fragments:
+        if not imported and BUFFER_ANNOTATION.search(fragment):
+            imported = True
+            yield BUFFER_IMPORT
+        yield fragment
+
+def _scan_stub(input_code: str, optimized: bool, fast: bool, renderers: Dict[str, Callable] = None) -> Tuple[str, List[Tuple[int, int]], str]:
+    """stub, parsed spans and the text the spans index into"""
     
-    # TODO: this code is ugly
-    mutable_string = list(input_code+" ")
-    for s, e in zip(start, end):
-        for i in range(s, e):
-            mutable_string[i] = ""
-            
-    stub_file = "\n".join(tree_str)
-    unparsed_lines = "".join(mutable_string).strip()
+    # indentblock needs newline as sentinal, scan_string indexes into the tab expanded text
+    input_code = (input_code + "\n").expandtabs()
     
+    tree_str, spans = [], []
+    for stub, start, end in _iter_stub(input_code, optimized, fast, renderers):
+        # matched but compile time only (cimports) renders as nothing
+        if stub:
+            tree_str.append(stub)
+        spans.append((start, end))
+            
+    return "\n".join(with_stub_imports(tree_str)), spans, input_code
+
+def cython_string_2_stub_regions(input_code: str, optimized: bool = False, fast: bool = False) -> Tuple[str, List[UnparsedRegion]]:
+    """stub and the regions of input_code the grammar did not match, see cython_string_2_stub"""
+    stub_file, spans, input_code = _scan_stub(input_code, optimized, fast)
+    return stub_file, unparsed_regions(input_code, spans)
+
+def cython_string_2_stub(input_code: str, optimized: bool = False, fast: bool = False) -> Tuple[str, str]:
+    """tree traversal and translation of ParseResults to string representation
+
+    optimized uses the context specific grammar, which produces the same stub
+    fast skips function bodies by indentation instead of parsing them (implies optimized)
+    """
+    stub_file, spans, input_code = _scan_stub(input_code, optimized, fast)
+    unparsed_lines = "".join(input_code[s:e] for s, e in parsed_gaps(len(input_code), spans)).strip()
     return stub_file, unparsed_lines
 
+def cython_pxd_2_stub_regions(pxd_code: str, pyx_code: str) -> Tuple[str, List[UnparsedRegion]]:
+    """stub of a module from its .pxd declarations and the docstrings of its .pyx implementation
+
+    cpdef signatures and public/readonly attributes come from pxd_code, docstrings and def methods
+    from pyx_code, which is parsed in fast mode. Unparsed regions refer to pyx_code.
+    """
+    declarations = pxd_declarations(pxd_code)
+
+    def pxd_cclass2str(result: ParseResults):
+        return cclass2str(result, declarations.classes.get(result[0][0]))
+
+    def pxd_cdef2str(result: ParseResults):
+        declaration, docs, body = result
+        if declaration.getName() == "cpdef_function_declaration" and declaration[1] in declarations.functions:
+            declaration = pxd_signature(declarations.functions[declaration[1]], declaration)
+        return cdef2str((declaration, docs, body))
+
+    renderers = {"cclass": pxd_cclass2str, "cdef": pxd_cdef2str}
+    stub_file, spans, pyx_code = _scan_stub(pyx_code, optimized=True, fast=True, renderers=renderers)
+    return stub_file, unparsed_regions(pyx_code, spans)
+
+def cython_pxd_2_stub(pxd_code: str, pyx_code: str) -> Tuple[str, str]:
+    """see cython_pxd_2_stub_regions, unparsed regions are joined by newlines"""
+    stub_file, regions = cython_pxd_2_stub_regions(pxd_code, pyx_code)
+    return stub_file, "\n".join(region.text for region in regions)
+
+# string literals and comments, whose brackets do not count towards the bracket depth,
+# a triple quoted string left open runs to the end of the line
+STRINGS_AND_COMMENTS = re.compile(r"""'''.*?(?:'''|$)|\"\"\".*?(?:\"\"\"|$)|'(?:\\.|[^'\\])*'|"(?:\\.|[^"\\])*"|#.*""")
+TRIPLE_QUOTES = re.compile(r"'''|\"\"\"")
+
+def bracket_depth_change(line: str, in_string: bool = False) -> int:
+    """opened minus closed brackets of a line outside of strings and comments
+
+    in_string is whether the line starts inside a triple quoted string, only the code after it counts
+    """
+    if in_string:
+        closing = TRIPLE_QUOTES.search(line)
+        line = line[closing.end():] if closing else ""
+    code = STRINGS_AND_COMMENTS.sub("", line)
+    return sum(map(code.count, "([{")) - sum(map(code.count, ")]}"))
+
+def split_top_level_blocks(lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    """group source lines (with line endings) into top level blocks, yields (first line number, block text)
+
+    A block starts at every unindented line, except the line after a decorator, consecutive imports
+    (which form one import section) and lines inside open brackets or a triple quoted string.
+    """
+    block, block_line = [], 1
+    previous = ""
+    in_string = False
+    depth = 0
+
+    for number, line in enumerate(lines, start=1):
+        starts_block = (
+            not in_string
+            and not depth
+            and line[:1] not in ("", " ", "\t", "\n", "\r")
+            and not previous.startswith("@")
+            and not (previous.startswith(("import ", "from ", "cimport ")) and line.startswith(("import ", "from ", "cimport ")))
+        )
+
+        if starts_block and block:
+            yield block_line, "".join(block)
+            block, block_line = [], number
+
+        block.append(line)
+        if line.strip():
+            if not in_string:
+                previous = line if line[:1] not in (" ", "\t") and not depth else previous
+            depth = max(depth + bracket_depth_change(line, in_string), 0)
+        if (line.count('"""') + line.count("'''")) % 2:
+            in_string = not in_string
+
+    if block:
+        yield block_line, "".join(block)
+
+def iter_cython_stub(source: Union[str, Iterable[str]], optimized: bool = False, fast: bool = False,
+                     unparsed: List[UnparsedRegion] = None) -> Iterator[str]:
+    """yield the stub fragments of source one top level block at a time
+
+    source is a string or an iterable of lines such as an open file, only one top level block
+    is held in memory. Joining the fragments with newlines gives the cython_string_2_stub stub
+    (unless a match crosses a block boundary, e.g. a one line def swallowing the next top level
+    lines as its body, or the import of BUFFER_TYPE, which is yielded before its first use rather than
+    after the leading imports), regions that were not parsed are appended to unparsed when it is given.
+    """
+    yield from iter_with_stub_imports(_iter_block_stubs(source, optimized, fast, unparsed))
+
+def _iter_block_stubs(source: Union[str, Iterable[str]], optimized: bool, fast: bool,
+                      unparsed: List[UnparsedRegion] = None) -> Iterator[str]:
+    """see iter_cython_stub, without the imports added for the type conversion"""
+    if isinstance(source, str):
+        source = source.splitlines(keepends=True)
+
+    offset, line = 0, 1
+    for _, block in split_top_level_blocks(source):
+        # every block gets the newline sentinal, spans past the original block are whitespace
+        block = block.expandtabs()
+        scanned = block + "\n"
+
+        spans = []
+        for stub, start, end in _iter_stub(scanned, optimized, fast):
+            spans.append((start, end))
+            if stub:
+                yield stub
+
+        if unparsed is not None:
+            for region in unparsed_regions(scanned, spans):
+                unparsed.append(region._replace(start=region.start + offset, end=region.end + offset, line=region.line + line - 1))
+
+        offset += len(block)
+        line += block.count("\n")
+
+def cython_file_2_stub_stream(file: Union[str, os.PathLike], out: IO[str], optimized: bool = False, fast: bool = False) -> List[UnparsedRegion]:
+    """write the stub of the file at path file to out as each top level block is parsed, returns the unparsed regions"""
+    unparsed = []
+    with open(file, mode="r") as f:
+        for i, stub in enumerate(iter_cython_stub(f, optimized=optimized, fast=fast, unparsed=unparsed)):
+            if i:
+                out.write("\n")
+            out.write(stub)
+            out.flush()
+    return unparsed
+
 def cython_file_2_stub(file: IO[str]) -> Tuple[str, str]:
     with open(file, mode="r") as f:
         input_code = f.read()
@@ -0,0 +1,195 @@
+"""
+Stub generation helpers used by setup.py.
+
+Generated stubs are cached by content hash so that unchanged .pyx files are
+neither re-parsed nor rewritten (which would bump the .pyi mtime). Modules with a .pxd
+are stubbed from their declarations, see cython_pxd_2_stub_regions.
+"""
+
+import ast
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from _build_config import path_as_module_name
+from _cython_peg import UnparsedRegion, cython_pxd_2_stub_regions, cython_string_2_stub_regions
+
+# bump when the layout of the cache file or the stub post-processing changes
+CACHE_VERSION = 2
+
+# modules with a hand written .pyi, e.g. because their Python surface is module level code the grammar skips
+HANDWRITTEN_STUBS = {"cython_template._capi"}
+
+_generator_paths = [Path(__file__).parent.joinpath(name) for name in ("_cython_peg.py", "_cython_grammar.py")]
+
+
+def generator_version() -> str:
+    """
+    Hash identifying the stub generator, any change to the grammar invalidates the cache
+    """
+    digest = hashlib.sha256(f"stub-cache-{CACHE_VERSION}".encode())
+    for path in _generator_paths:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class StubResult(NamedTuple):
+    source: Path
+    unparsed: List[UnparsedRegion]
+    regenerated: bool
+
+
+class StubCache:
+    """
+    Persistent mapping of .pyx path -> (source hash, stub, unparsed input)
+    """
+
+    def __init__(self, path: Path, force: bool = False):
+        self.path = path
+        self.version = generator_version()
+        self.entries: Dict[str, dict] = {}
+        self.dirty = False
+
+        if force or not path.exists():
+            return
+
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            logging.warning(f"Ignoring unreadable stub cache {path}")
+            return
+
+        if data.get("version") == self.version:
+            self.entries = data.get("entries", {})
+
+    def lookup(self, source: Path, digest: str) -> Optional[dict]:
+        entry = self.entries.get(source.as_posix())
+        if entry is not None and entry["source_hash"] == digest:
+            return entry
+        return None
+
+    def store(self, source: Path, digest: str, stub: str, unparsed: List[UnparsedRegion]):
+        self.entries[source.as_posix()] = {
+            "source_hash": digest,
+            "stub": stub,
+            "unparsed": [list(region) for region in unparsed],
+        }
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.write_text(json.dumps({"version": self.version, "entries": self.entries}, indent=1))
+        self.dirty = False
+
+
+def write_if_changed(path: Path, text: str) -> bool:
+    """
+    Write text to path unless it already holds exactly that text, returns True if written
+    """
+    try:
+        if path.read_text() == text:
+            return False
+    except OSError:
+        pass
+
+    with open(path, mode="w") as fi:
+        fi.write(text)
+    return True
+
+
+def stub_regions(pyx_text: str, pxd_text: Optional[str]) -> Tuple[str, List[UnparsedRegion]]:
+    if pxd_text is None:
+        return cython_string_2_stub_regions(pyx_text, optimized=True)
+    return cython_pxd_2_stub_regions(pxd_text, pyx_text)
+
+
+def generate_stubs(sources: Sequence[Path], cache: StubCache, workers: int = 1) -> List[StubResult]:
+    """
+    Generate the .pyi next to each source, skipping the parse when the cache is warm.
+
+    Cache misses are parsed in a process pool when workers > 1, results are returned in
+    the order of sources regardless of completion order.
+    """
+    texts = [source.read_text() for source in sources]
+    pxd_texts = [
+        source.with_suffix(".pxd").read_text() if source.with_suffix(".pxd").exists() else None
+        for source in sources
+    ]
+    digests = [source_hash(text + "\0" + (pxd_text or "")) for text, pxd_text in zip(texts, pxd_texts)]
+    entries = [cache.lookup(source, digest) for source, digest in zip(sources, digests)]
+
+    misses = [i for i, entry in enumerate(entries) if entry is None]
+    if workers > 1 and len(misses) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(misses))) as pool:
+            parsed = list(pool.map(stub_regions, [texts[i] for i in misses], [pxd_texts[i] for i in misses]))
+    else:
+        parsed = [stub_regions(texts[i], pxd_texts[i]) for i in misses]
+
+    for i, (stub, unparsed) in zip(misses, parsed):
+        cache.store(sources[i], digests[i], stub, unparsed)
+        entries[i] = cache.lookup(sources[i], digests[i])
+
+    results = []
+    for i, (source, entry) in enumerate(zip(sources, entries)):
+        write_if_changed(source.with_suffix(".pyi"), entry["stub"])
+        unparsed = [UnparsedRegion(*region) for region in entry["unparsed"]]
+        results.append(StubResult(source, unparsed, i in misses))
+
+    return results
+
+
+def stub_syntax_error(stub: str) -> Optional[SyntaxError]:
+    """
+    The SyntaxError of a generated stub, None when it is valid Python
+    """
+    try:
+        ast.parse(stub)
+    except SyntaxError as e:
+        return e
+    return None
+
+
+def generate_stub_files(sources: Sequence[Path], workers: int = 1) -> List[StubResult]:
+    """
+    Generate stubs through the stub cache next to this file and warn about unparsed input.
+
+    Set CYTHON_TEMPLATE_FORCE_STUBS=1 to ignore the stub cache. Modules in HANDWRITTEN_STUBS are skipped.
+    """
+    sources = [source for source in sources if path_as_module_name(source) not in HANDWRITTEN_STUBS]
+    cache = StubCache(
+        Path(__file__).parent.joinpath(".stub_cache.json"),
+        force=os.environ.get("CYTHON_TEMPLATE_FORCE_STUBS", "0") not in ("", "0"),
+    )
+
+    results = generate_stubs(sources, cache, workers=workers)
+    cache.save()
+
+    unparsed_inputs = [
+        f"{result.source}:{region.line}:{region.column}: {region.text.splitlines()[0]}"
+        for result in results
+        for region in result.unparsed
+    ]
+
+    if unparsed_inputs:
+        logging.warning("Unparsed input in:\n" + "\n".join(f"  {u}" for u in unparsed_inputs))
+
+    invalid_stubs = []
+    for result in results:
+        stub = result.source.with_suffix(".pyi")
+        error = stub_syntax_error(stub.read_text())
+        if error is not None:
+            invalid_stubs.append(f"{stub}:{error.lineno}: {error.msg}: {(error.text or '').strip()}")
+
+    if invalid_stubs:
+        logging.warning("Invalid Python in generated stubs:\n" + "\n".join(f"  {i}" for i in invalid_stubs))
+
+    return results
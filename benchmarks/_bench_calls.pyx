@@ -0,0 +1,36 @@
+"""
+C level callers of the cython_template entry points for bench_calls.py, built with pyximport.
+
+Every function makes n calls through the cimported declarations, the same dispatch
+Class1.add_two uses to reach _module2.custom_function2.
+"""
+
+from cython_template._module1 cimport Class1
+from cython_template._concurrent cimport ConcurrentClass1
+from cython_template cimport _module2
+
+
+def class1_add(Class1 obj, Py_ssize_t n):
+    cdef Py_ssize_t i
+    for i in range(n):
+        obj.add(1)
+
+
+def class1_add_two(Class1 obj, Py_ssize_t n):
+    cdef Py_ssize_t i
+    for i in range(n):
+        obj.add_two()
+
+
+def custom_function2(Py_ssize_t n):
+    cdef Py_ssize_t i
+    cdef int x = 0
+    for i in range(n):
+        x = _module2.custom_function2(x) & 0xffff
+    return x
+
+
+def concurrent_add(ConcurrentClass1 obj, Py_ssize_t n):
+    cdef Py_ssize_t i
+    for i in range(n):
+        obj.add(1)
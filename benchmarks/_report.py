@@ -0,0 +1,60 @@
+"""
+JSON report and baseline helpers shared by the benchmarks.
+
+Every benchmark writes a {"results": [...], ...} report to --output (stdout without it) and,
+given a previous report as --baseline, exits with status 1 when a result got slower than
+--tolerance allows.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Callable, Hashable, List, Optional
+
+
+def add_report_arguments(parser: argparse.ArgumentParser, baseline: bool = True):
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    if baseline:
+        parser.add_argument("--baseline", type=Path, help="previous JSON report to check for regressions")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+
+
+def slower(
+    results: list,
+    baseline: dict,
+    key: Callable[[dict], Hashable],
+    metric: str,
+    tolerance: float,
+    describe: Callable[[dict, dict], str],
+) -> List[str]:
+    """
+    describe(before, result) of every result whose metric grew by more than tolerance since the baseline result with the same key
+    """
+    previous = {key(r): r for r in baseline["results"]}
+    regressions = []
+
+    for result in results:
+        before = previous.get(key(result))
+        if before is not None and result[metric] > before[metric] * (1 + tolerance):
+            regressions.append(describe(before, result))
+
+    return regressions
+
+
+def finish(args: argparse.Namespace, report: dict, compare: Optional[Callable[[list, dict, float], List[str]]] = None):
+    """
+    Write the report and exit with status 1 when compare(results, baseline, tolerance) finds regressions
+    """
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+    if compare is not None and getattr(args, "baseline", None):
+        regressions = compare(report["results"], json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
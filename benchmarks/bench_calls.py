@@ -0,0 +1,186 @@
+"""
+Call overhead benchmark for the cython_template entry points.
+
+Times each exported function/method called from Python, from C through the cimported .pxd
+declarations (_bench_calls.pyx, built with pyximport on first use) and in batched form, and
+reports latency per call and calls per second as JSON. Passing a previous report as --baseline
+fails when a case got slower than the tolerance.
+
+    python setup.py build_ext --inplace
+    python benchmarks/bench_calls.py --output bench_calls.json
+    python benchmarks/bench_calls.py --baseline bench_calls.json
+"""
+
+import argparse
+import platform
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Callable, Dict
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from _report import add_report_arguments, finish, slower
+from cython_template import concurrent, module1, module2
+
+
+def python_cases() -> Dict[str, Callable[[int], None]]:
+    def class1_add(n: int):
+        add = module1.Class1().add
+        for _ in range(n):
+            add(1)
+
+    def class1_add_two(n: int):
+        add_two = module1.Class1().add_two
+        for _ in range(n):
+            add_two()
+
+    def custom_function2(n: int):
+        function = module2.custom_function2
+        for _ in range(n):
+            function(0)
+
+    def concurrent_add(n: int):
+        add = concurrent.ConcurrentClass1().add
+        for _ in range(n):
+            add(1)
+
+    def empty_loop(n: int):
+        for _ in range(n):
+            pass
+
+    return {
+        "Class1.add": class1_add,
+        "Class1.add_two": class1_add_two,
+        "custom_function2": custom_function2,
+        "ConcurrentClass1.add": concurrent_add,
+        "empty loop": empty_loop,
+    }
+
+
+def cimport_cases() -> Dict[str, Callable[[int], None]]:
+    import pyximport
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    pyximport.install(language_level=3, setup_args={"include_dirs": [str(root)]})
+    import _bench_calls
+
+    return {
+        "Class1.add": lambda n: _bench_calls.class1_add(module1.Class1(), n),
+        "Class1.add_two": lambda n: _bench_calls.class1_add_two(module1.Class1(), n),
+        "custom_function2": _bench_calls.custom_function2,
+        "ConcurrentClass1.add": lambda n: _bench_calls.concurrent_add(concurrent.ConcurrentClass1(), n),
+    }
+
+
+def batched_cases() -> Dict[str, Callable[[int], None]]:
+    # the buffers are built once per size, outside of the timed call
+    ones: Dict[int, array] = {}
+
+    def buffer(n: int) -> array:
+        if n not in ones:
+            ones[n] = array("i", [1]) * n
+        return ones[n]
+
+    def class1_add_many(n: int):
+        module1.Class1().add_many(buffer(n))
+
+    def class1_array_add_two(n: int):
+        module1.Class1Array(n).add_two()
+
+    def custom_function2_array(n: int):
+        module2.custom_function2_array(buffer(n), parallel=False)
+
+    def concurrent_add_many(n: int):
+        concurrent.ConcurrentClass1().add_many(buffer(n))
+
+    return {
+        "Class1.add_many": class1_add_many,
+        "Class1Array.add_two": class1_array_add_two,
+        "custom_function2_array": custom_function2_array,
+        "ConcurrentClass1.add_many": concurrent_add_many,
+    }
+
+
+def measure(kind: str, name: str, case: Callable[[int], None], calls: int, repeat: int) -> dict:
+    # warm up (buffers, lazily bound attributes)
+    case(min(calls, 1000))
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case(calls)
+        times.append(time.perf_counter() - start)
+
+    best = min(times)
+    return {
+        "kind": kind,
+        "name": name,
+        "calls": calls,
+        "seconds": best,
+        "ns_per_call": best / calls * 1e9,
+        "calls_per_second": calls / best if best else None,
+    }
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """
+    Regressions of results against a previous report
+    """
+    return slower(
+        results, baseline, lambda r: (r["kind"], r["name"]), "ns_per_call", tolerance,
+        lambda before, r: f"{r['kind']} {r['name']}: {before['ns_per_call']:.1f}ns -> {r['ns_per_call']:.1f}ns per call",
+    )
+
+
+KINDS = {
+    "python": python_cases,
+    "cimport": cimport_cases,
+    "batched": batched_cases,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kinds", nargs="+", choices=list(KINDS), default=list(KINDS))
+    parser.add_argument("--calls", type=int, default=1_000_000, help="calls per measurement")
+    parser.add_argument("--repeat", type=int, default=5)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    results = []
+    for kind in args.kinds:
+        try:
+            cases = KINDS[kind]()
+        except ImportError as e:
+            # the cimport cases need Cython and a C compiler at benchmark time
+            print(f"skipping {kind}: {e}", file=sys.stderr)
+            continue
+
+        for name, case in cases.items():
+            result = measure(kind, name, case, args.calls, args.repeat)
+            results.append(result)
+            print(
+                f"{kind:>8} {name:<26} {result['ns_per_call']:8.2f}ns/call {result['calls_per_second']:.3g} calls/s",
+                file=sys.stderr,
+            )
+
+    try:
+        from cython_template import _build_info
+        build_profile = _build_info.PROFILE
+    except ImportError:
+        build_profile = None
+
+    report = {
+        "python": platform.python_version(),
+        "build_profile": build_profile,
+        "results": results,
+    }
+
+    finish(args, report, compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Multi-threaded stress benchmark for concurrent.ConcurrentClass1.
+
+Every thread applies the same number of updates to one shared counter, either one add() call per
+update or add_many() over buffers (which releases the GIL). Counters are a Python int behind a
+threading.Lock, ConcurrentClass1 and a sharded ConcurrentClass1. The JSON report holds the
+throughput of each case and its speedup over the first --threads count, the run fails if a
+counter lost updates.
+
+Per call updates only scale on a free-threaded build, add_many scales with the GIL as well.
+cython_template.concurrent keeps the GIL disabled on free-threaded builds, module1 is not
+imported because it would enable it again.
+
+    python setup.py build_ext --inplace
+    python benchmarks/bench_concurrent.py --output bench_concurrent.json
+"""
+
+import argparse
+import os
+import platform
+import sys
+import threading
+import time
+from array import array
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from _report import add_report_arguments, finish
+from cython_template import concurrent
+
+
+class LockedCounter:
+    """
+    The baseline, a Python int behind a Python lock
+    """
+
+    def __init__(self):
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    def add(self, x: int):
+        with self.lock:
+            self.counter += x
+
+    def add_many(self, values):
+        total = sum(values)
+        with self.lock:
+            self.counter += total
+
+    @property
+    def value(self) -> int:
+        with self.lock:
+            return self.counter
+
+
+COUNTERS = {
+    "locked": lambda shards: LockedCounter(),
+    "atomic": lambda shards: concurrent.ConcurrentClass1(),
+    "sharded": lambda shards: concurrent.ConcurrentClass1(shards),
+}
+
+
+def add_worker(counter, updates: int, chunk):
+    add = counter.add
+    for _ in range(updates):
+        add(1)
+
+
+def add_many_worker(counter, updates: int, chunk):
+    add_many = counter.add_many
+    for _ in range(updates // len(chunk)):
+        add_many(chunk)
+
+
+WORKERS = {
+    "add": add_worker,
+    "add_many": add_many_worker,
+}
+
+
+def measure(counter_name: str, mode: str, threads: int, updates: int, chunk_size: int, shards: int, repeat: int) -> dict:
+    chunk = array("i", [1]) * chunk_size
+    updates -= updates % chunk_size
+    worker = WORKERS[mode]
+
+    times = []
+    for _ in range(repeat):
+        counter = COUNTERS[counter_name](shards)
+        barrier = threading.Barrier(threads + 1)
+
+        def run():
+            barrier.wait()
+            worker(counter, updates, chunk)
+
+        pool = [threading.Thread(target=run) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in pool:
+            thread.join()
+        times.append(time.perf_counter() - start)
+
+        expected = updates * threads
+        if counter.value != expected:
+            raise AssertionError(f"{counter_name} {mode} threads={threads}: {counter.value} != {expected}, updates were lost")
+
+    best = min(times)
+    return {
+        "counter": counter_name,
+        "mode": mode,
+        "threads": threads,
+        "updates_per_thread": updates,
+        "seconds": best,
+        "updates_per_second": updates * threads / best if best else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--counters", nargs="+", choices=sorted(COUNTERS), default=sorted(COUNTERS))
+    parser.add_argument("--modes", nargs="+", choices=sorted(WORKERS), default=sorted(WORKERS))
+    parser.add_argument("--updates", type=int, default=200_000, help="updates per thread with add")
+    parser.add_argument("--batched-updates", type=int, default=50_000_000, help="updates per thread with add_many")
+    parser.add_argument("--chunk", type=int, default=100_000, help="buffer length passed to add_many")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1, help="shards of the sharded counter")
+    parser.add_argument("--repeat", type=int, default=3)
+    add_report_arguments(parser, baseline=False)
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes:
+        updates = args.updates if mode == "add" else args.batched_updates
+        chunk_size = 1 if mode == "add" else args.chunk
+        for counter_name in args.counters:
+            single = None
+            for threads in args.threads:
+                result = measure(counter_name, mode, threads, updates, chunk_size, args.shards, args.repeat)
+                single = single or result["updates_per_second"]
+                result["speedup"] = result["updates_per_second"] / single
+                results.append(result)
+                print(
+                    f"{mode:>8} {counter_name:>7} threads={threads:<3} {result['seconds']:.3f}s "
+                    f"{result['updates_per_second']:.3g} updates/s speedup={result['speedup']:.2f}",
+                    file=sys.stderr,
+                )
+
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)
+    report = {
+        "python": platform.python_version(),
+        "gil_enabled": is_gil_enabled(),
+        "cpu_count": os.cpu_count(),
+        "shards": args.shards,
+        "results": results,
+    }
+
+    finish(args, report)
+
+
+if __name__ == "__main__":
+    main()
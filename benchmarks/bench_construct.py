@@ -0,0 +1,107 @@
+"""
+Construction rate benchmark for module1.Class1.
+
+Times short lived instances (created and dropped at once, served from the Class1 freelist),
+lists of instances built with Class1() calls and lists built by new_class1_list, and reports
+instances per second as JSON. Passing a previous report as --baseline fails when a case got
+slower than the tolerance.
+
+    python setup.py build_ext --inplace
+    python benchmarks/bench_construct.py --output bench_construct.json
+    python benchmarks/bench_construct.py --baseline bench_construct.json
+"""
+
+import argparse
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from _report import add_report_arguments, finish, slower
+from cython_template import module1
+
+
+def churn(n: int):
+    cls = module1.Class1
+    for _ in range(n):
+        cls()
+
+
+def comprehension(n: int):
+    cls = module1.Class1
+    return [cls() for _ in range(n)]
+
+
+def bulk(n: int):
+    return module1.new_class1_list(n)
+
+
+CASES = {
+    "churn": churn,
+    "comprehension": comprehension,
+    "new_class1_list": bulk,
+}
+
+
+def measure(name: str, case: Callable[[int], object], instances: int, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = case(instances)
+        times.append(time.perf_counter() - start)
+        # lists are freed outside of the timed region
+        del result
+
+    best = min(times)
+    return {
+        "case": name,
+        "instances": instances,
+        "seconds": best,
+        "ns_per_instance": best / instances * 1e9,
+        "instances_per_second": instances / best if best else None,
+    }
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """
+    Regressions of results against a previous report
+    """
+    return slower(
+        results, baseline, lambda r: (r["case"], r["instances"]), "seconds", tolerance,
+        lambda before, r: f"{r['case']} instances={r['instances']}: "
+                          f"{before['ns_per_instance']:.1f}ns -> {r['ns_per_instance']:.1f}ns per instance",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instances", type=int, nargs="+", default=[1_000, 1_000_000])
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=5)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    results = []
+    for instances in args.instances:
+        for name in args.cases:
+            result = measure(name, CASES[name], instances, args.repeat)
+            results.append(result)
+            print(
+                f"{name:>15} instances={instances:<9} {result['ns_per_instance']:7.1f}ns/instance "
+                f"{result['instances_per_second']:.3g} instances/s",
+                file=sys.stderr,
+            )
+
+    report = {
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+    finish(args, report, compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Import time benchmark for the cython_template package.
+
+Runs each import statement in fresh interpreters under -X importtime and reports the median time
+spent in the imports it makes (cython_template, its submodules and what they import) and the
+median wall time of the interpreter beyond an empty one, as JSON. Passing a previous report as
+--baseline fails when a statement got slower than the tolerance.
+
+    python setup.py build_ext --inplace
+    python benchmarks/bench_import.py --output bench_import.json
+    python benchmarks/bench_import.py --baseline bench_import.json
+"""
+
+import argparse
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from _report import add_report_arguments, finish, slower
+
+root = Path(__file__).resolve().parent.parent
+
+STATEMENTS = [
+    "import cython_template",
+    "from cython_template import module1",
+    "from cython_template import module2",
+    "from cython_template import module1, module2",
+    "from cython_template import concurrent",
+]
+
+
+def statement_import_us(importtime: str) -> int:
+    """
+    Cumulative microseconds of the top level imports made after interpreter startup (site) in -X importtime output
+
+    Extension modules show the imports of their module init as top level entries rather than nested ones,
+    so everything imported by the statement is counted, not only the cython_template entries.
+    """
+    total, started = 0, False
+    for line in importtime.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # nested imports are indented below the import that triggered them
+        if name.startswith("  "):
+            continue
+        if started:
+            total += int(cumulative)
+        started = started or name.strip() == "site"
+    return total
+
+
+def run(statement: str) -> tuple:
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=root,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, statement_import_us(process.stderr)
+
+
+def measure(statement: str, repeat: int, interpreter_seconds: float) -> dict:
+    # the first run may compile bytecode, it is not counted
+    run(statement)
+    walls, imports = zip(*(run(statement) for _ in range(repeat)))
+
+    return {
+        "statement": statement,
+        "import_us": statistics.median(imports),
+        "wall_ms": (statistics.median(walls) - interpreter_seconds) * 1e3,
+    }
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """
+    Regressions of results against a previous report
+    """
+    return slower(
+        results, baseline, lambda r: r["statement"], "import_us", tolerance,
+        lambda before, r: f"{r['statement']}: {before['import_us']}us -> {r['import_us']}us",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--statements", nargs="+", default=STATEMENTS)
+    parser.add_argument("--repeat", type=int, default=15)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    interpreter_seconds = statistics.median(run("pass")[0] for _ in range(args.repeat))
+
+    results = []
+    for statement in args.statements:
+        result = measure(statement, args.repeat, interpreter_seconds)
+        results.append(result)
+        print(f"{statement:<45} import {result['import_us'] / 1e3:6.2f}ms  wall +{result['wall_ms']:6.2f}ms", file=sys.stderr)
+
+    report = {
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+    finish(args, report, compare)
+
+
+if __name__ == "__main__":
+    main()
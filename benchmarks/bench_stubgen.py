@@ -0,0 +1,232 @@
+"""
+Benchmark for the stub generator in _cython_peg.
+
+Generates synthetic .pyx corpora of increasing size and complexity, times cython_string_2_stub
+in each grammar mode and reports throughput and peak memory as JSON. Passing a previous report
+as --baseline fails when a case got slower than the tolerance or its stub changed.
+
+    python benchmarks/bench_stubgen.py --output bench_stubgen.json
+    python benchmarks/bench_stubgen.py --baseline bench_stubgen.json
+"""
+
+import argparse
+import hashlib
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pyparsing
+from _cython_peg import cython_string_2_stub
+from _report import add_report_arguments, finish, slower
+
+MODES = {
+    "default": {},
+    "optimized": {"optimized": True},
+    "fast": {"fast": True},
+}
+
+
+def import_section(i: int) -> list:
+    return [
+        "import os, sys",
+        "from libc.math cimport sqrt, floor",
+        "from typing import (List, Dict, Tuple, Optional)",
+        f"from .module{i} import helper as helper{i}",
+        "",
+    ]
+
+
+def arguments(count: int) -> str:
+    types = ["int", "double", "float", "long", "object", "double[:, ::1]", "int[:]", "list"]
+    defaults = ["", " = 1", " = 2.5", " = 1 + 2 * 3", " = None", "", "", " = [1, 2]"]
+    return ", ".join(f"{types[j % len(types)]} a{j}{defaults[j % len(defaults)]}" for j in range(count))
+
+
+def body(indent: str, lines: int) -> list:
+    out = [f"{indent}cdef int t = 0"]
+    for j in range(lines):
+        out.append(f"{indent}if t > {j}:")
+        out.append(f"{indent}    t += call(t, [{j}, {j + 1}], {{'k': {j}}})")
+    out.append(f"{indent}return t")
+    return out
+
+
+def cdef_class(i: int, complexity: int) -> list:
+    out = [
+        f"cdef class Class{i}(object):",
+        '    """',
+        f"    Synthetic class {i}.",
+        '    """',
+        "    cdef int x",
+        "    cdef public double[:, ::1] buffer",
+        "",
+        "    def __init__(self):",
+        '        """initialize"""',
+        "        self.x = 0",
+        "",
+        f"    cpdef int method(self, {arguments(2 + complexity * 2)}):",
+        '        """',
+        "        A method with a long argument list.",
+        '        """',
+        *body("        ", complexity * 4),
+        "",
+        "    cdef void hidden(self, int a) nogil:",
+        "        pass",
+        "",
+        "    def nested(self, a: int = 3, b: List[int] = None) -> Dict[str, int]:",
+        "        def inner(x):",
+        "            def innermost(y):",
+        "                return y",
+        "            return innermost(x)",
+        "        return {}",
+        "",
+    ]
+    return out
+
+
+def functions(i: int, complexity: int) -> list:
+    return [
+        f"def function{i}(a: int, b: float = 1.5, *args, c: str = 'q') -> Tuple[int, int]:",
+        '    """docstring"""',
+        *body("    ", complexity * 4),
+        "",
+        f"cpdef double cfunction{i}({arguments(2 + complexity * 2)}) nogil:",
+        *body("    ", complexity * 4),
+        "",
+        f"cdef int private{i}(int a, int b):",
+        "    return a + b",
+        "",
+    ]
+
+
+def records(i: int) -> list:
+    return [
+        f"cdef struct Struct{i}:",
+        "    int a",
+        "    double b",
+        "",
+        "@dataclass",
+        f"class Data{i}:",
+        '    """dataclass"""',
+        "    a: int = 0",
+        "    b: str = 'x'",
+        "",
+        f"class Python{i}:",
+        '    """python class"""',
+        "    def method(self, x: int) -> int:",
+        '        """method"""',
+        "        return x",
+        "",
+    ]
+
+
+def generate_corpus(blocks: int, complexity: int = 1) -> str:
+    """
+    Synthetic Cython source with the given number of top level block groups
+    """
+    lines = []
+    for i in range(blocks):
+        kind = i % 4
+        if kind == 0:
+            lines += import_section(i)
+        elif kind == 1:
+            lines += cdef_class(i, complexity)
+        elif kind == 2:
+            lines += functions(i, complexity)
+        else:
+            lines += records(i)
+    return "\n".join(lines) + "\n"
+
+
+def measure(source: str, mode: str, repeat: int) -> dict:
+    kwargs = MODES[mode]
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stub, unparsed = cython_string_2_stub(source, **kwargs)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    cython_string_2_stub(source, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(times)
+    lines = source.count("\n")
+    return {
+        "mode": mode,
+        "lines": lines,
+        "bytes": len(source),
+        "seconds": best,
+        "lines_per_second": lines / best if best else None,
+        "peak_memory_bytes": peak,
+        "stub_bytes": len(stub),
+        "stub_sha256": hashlib.sha256(stub.encode()).hexdigest(),
+        "unparsed_bytes": len(unparsed),
+    }
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """
+    Regressions of results against a previous report
+    """
+    def key(r: dict) -> tuple:
+        return r["mode"], r["blocks"], r["complexity"]
+
+    def case(r: dict) -> str:
+        return f"{r['mode']} blocks={r['blocks']} complexity={r['complexity']}"
+
+    regressions = slower(
+        results, baseline, key, "seconds", tolerance,
+        lambda before, r: f"{case(r)}: {before['seconds']:.3f}s -> {r['seconds']:.3f}s",
+    )
+
+    previous = {key(r): r for r in baseline["results"]}
+    for result in results:
+        before = previous.get(key(result))
+        if before is not None and result["stub_sha256"] != before.get("stub_sha256", result["stub_sha256"]):
+            regressions.append(f"{case(result)}: generated stub changed")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 32, 128, 512], help="number of top level block groups")
+    parser.add_argument("--complexity", type=int, nargs="+", default=[1, 4], help="body length / argument count factor")
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=sorted(MODES))
+    parser.add_argument("--repeat", type=int, default=3)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+
+    results = []
+    for complexity in args.complexity:
+        for size in args.sizes:
+            source = generate_corpus(size, complexity)
+            for mode in args.modes:
+                result = measure(source, mode, args.repeat)
+                result.update(blocks=size, complexity=complexity)
+                results.append(result)
+                print(
+                    f"{mode:>9} blocks={size:<5} complexity={complexity:<3} lines={result['lines']:<7} "
+                    f"{result['seconds']:.3f}s {result['lines_per_second']:.0f} lines/s "
+                    f"peak={result['peak_memory_bytes'] / 2**20:.1f}MiB",
+                    file=sys.stderr,
+                )
+
+    report = {
+        "python": platform.python_version(),
+        "pyparsing": pyparsing.__version__,
+        "results": results,
+    }
+
+    finish(args, report, compare)
+
+
+if __name__ == "__main__":
+    main()
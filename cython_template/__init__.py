@@ -1,3 +1,39 @@
 
-from . import _module1 as module1
-from . import _module2 as module2
+# submodules are imported on first attribute access (PEP 562), add new ones to _submodules
+_submodules = {
+    "module1": "_module1",
+    "module2": "_module2",
+    "concurrent": "_concurrent",
+}
+
+__all__ = list(_submodules)
+
+# typing.TYPE_CHECKING without importing typing, type checkers treat the name as True
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from . import _module1 as module1
+    from . import _module2 as module2
+    from . import _concurrent as concurrent
+
+
+def __getattr__(name: str):
+    if name in _submodules:
+        from importlib import import_module
+
+        module = import_module(f"{__name__}.{_submodules[name]}")
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_include() -> str:
+    """
+    Directory of cython_template_api.h, the header of the C API exported by cython_template._capi
+    """
+    import os
+
+    return os.path.dirname(__file__)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_submodules))
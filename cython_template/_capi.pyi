@@ -0,0 +1,4 @@
+# written by hand, the table behind _C_API is described in cython_template_api.h
+from typing_extensions import CapsuleType
+
+_C_API: CapsuleType
@@ -0,0 +1,73 @@
+from cpython.pycapsule cimport PyCapsule_New
+from cpython.ref cimport Py_INCREF, PyObject, PyTypeObject
+
+from ._module1 cimport Class1
+from . cimport _module2
+
+
+cdef extern from "cython_template_api.h":
+    const char *CAPSULE_NAME "CYTHON_TEMPLATE_API_CAPSULE"
+    int API_VERSION "CYTHON_TEMPLATE_API_VERSION"
+
+    ctypedef struct CythonTemplate_API:
+        int version
+        size_t size
+        PyTypeObject *class1_type
+        PyObject *(*class1_new)() except NULL
+        int (*class1_add)(PyObject *obj, int x) noexcept nogil
+        int (*class1_add_two)(PyObject *obj) noexcept nogil
+        int (*class1_read)(PyObject *obj) noexcept nogil
+        int (*custom_function2)(int x) noexcept nogil
+
+
+cdef PyObject *class1_new() except NULL:
+    obj = Class1.__new__(Class1)
+    Py_INCREF(obj)
+    return <PyObject *> obj
+
+
+cdef Py_ssize_t class1_value_offset():
+    cdef Class1 probe = Class1.__new__(Class1)
+    return <char *> &probe.x - <char *> <PyObject *> probe
+
+
+# offset of the value inside a Class1 object, measured when the module is imported, so the
+# functions below reach it from a PyObject * without the GIL or a reference count update
+cdef Py_ssize_t x_offset = class1_value_offset()
+
+
+cdef inline int *class1_value(PyObject *obj) noexcept nogil:
+    return <int *> (<char *> obj + x_offset)
+
+
+cdef int class1_add(PyObject *obj, int x) noexcept nogil:
+    cdef int *value = class1_value(obj)
+    value[0] += x
+    return value[0]
+
+
+cdef int class1_add_two(PyObject *obj) noexcept nogil:
+    cdef int *value = class1_value(obj)
+    value[0] = _module2.custom_function2(value[0])
+    return value[0]
+
+
+cdef int class1_read(PyObject *obj) noexcept nogil:
+    return class1_value(obj)[0]
+
+
+cdef int custom_function2(int x) noexcept nogil:
+    return _module2.custom_function2(x)
+
+
+cdef CythonTemplate_API api
+api.version = API_VERSION
+api.size = sizeof(CythonTemplate_API)
+api.class1_type = <PyTypeObject *> Class1
+api.class1_new = class1_new
+api.class1_add = class1_add
+api.class1_add_two = class1_add_two
+api.class1_read = class1_read
+api.custom_function2 = custom_function2
+
+_C_API = PyCapsule_New(&api, CAPSULE_NAME, NULL)
@@ -0,0 +1,9 @@
+cdef class ConcurrentClass1:
+    cdef int *data
+    cdef Py_ssize_t shards
+    cdef int *shard(self) noexcept nogil
+    cdef int load(self) noexcept nogil
+    cdef void add_nogil(self, int x) noexcept nogil
+    cpdef void add(self, int x)
+    cpdef void add_two(self)
+    cpdef void add_many(self, const int[:] values)
@@ -0,0 +1,124 @@
+# cython: freethreading_compatible=True
+# ConcurrentClass1 only updates its counters atomically, so importing this module keeps the GIL disabled on free-threaded builds
+
+from cpython.mem cimport PyMem_Calloc, PyMem_Free
+
+from . cimport _module2
+
+
+cdef extern from *:
+    """
+    #include "pythread.h"
+
+    /* ints between two shards, keeps every shard on its own 64 byte cache line */
+    #define CYTHON_TEMPLATE_SHARD_STRIDE 16
+
+    #if defined(_MSC_VER)
+    #include <intrin.h>
+    static CYTHON_INLINE int cython_template_atomic_add(int *p, int x) {
+        return _InterlockedExchangeAdd((volatile long *) p, x) + x;
+    }
+    static CYTHON_INLINE int cython_template_atomic_load(int *p) {
+        return _InterlockedOr((volatile long *) p, 0);
+    }
+    static CYTHON_INLINE int cython_template_atomic_cas(int *p, int expected, int desired) {
+        return _InterlockedCompareExchange((volatile long *) p, desired, expected) == expected;
+    }
+    #else
+    static CYTHON_INLINE int cython_template_atomic_add(int *p, int x) {
+        return __atomic_add_fetch(p, x, __ATOMIC_SEQ_CST);
+    }
+    static CYTHON_INLINE int cython_template_atomic_load(int *p) {
+        return __atomic_load_n(p, __ATOMIC_SEQ_CST);
+    }
+    static CYTHON_INLINE int cython_template_atomic_cas(int *p, int expected, int desired) {
+        return __atomic_compare_exchange_n(p, &expected, desired, 0, __ATOMIC_SEQ_CST, __ATOMIC_SEQ_CST);
+    }
+    #endif
+
+    /* PyThread_get_thread_ident does not need the GIL */
+    static CYTHON_INLINE unsigned long long cython_template_thread_hash(void) {
+        return ((unsigned long long) PyThread_get_thread_ident() * 0x9E3779B97F4A7C15ULL) >> 32;
+    }
+    """
+    int atomic_add "cython_template_atomic_add" (int *p, int x) noexcept nogil
+    int atomic_load "cython_template_atomic_load" (int *p) noexcept nogil
+    bint atomic_cas "cython_template_atomic_cas" (int *p, int expected, int desired) noexcept nogil
+    unsigned long long thread_hash "cython_template_thread_hash" () noexcept nogil
+    enum: SHARD_STRIDE "CYTHON_TEMPLATE_SHARD_STRIDE"
+
+
+cdef class ConcurrentClass1:
+    """
+    This is a Class1 that is safe to update from several threads at once, including nogil code and free-threaded builds.
+    Updates do not return the new integer, read value instead. With shards > 1 every thread
+    updates its own shard and value sums all shards, so writers do not contend on one counter.
+    """
+
+    def __cinit__(self, Py_ssize_t shards=1):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+
+        self.data = <int *> PyMem_Calloc(shards * SHARD_STRIDE, sizeof(int))
+        if self.data == NULL:
+            raise MemoryError()
+        self.shards = shards
+
+    def __dealloc__(self):
+        PyMem_Free(self.data)
+
+    @property
+    def value(self):
+        """
+        The current integer, the sum of all shards.
+        """
+        return self.load()
+
+    cdef int *shard(self) noexcept nogil:
+        if self.shards == 1:
+            return self.data
+        return self.data + (thread_hash() % <unsigned long long> self.shards) * SHARD_STRIDE
+
+    cdef int load(self) noexcept nogil:
+        cdef Py_ssize_t i
+        cdef int x = 0
+
+        for i in range(self.shards):
+            x += atomic_load(self.data + i * SHARD_STRIDE)
+        return x
+
+    cdef void add_nogil(self, int x) noexcept nogil:
+        atomic_add(self.shard(), x)
+
+    cpdef void add(self, int x):
+        """
+        This atomically adds an integer to the contained value.
+        """
+        atomic_add(self.shard(), x)
+
+    cpdef void add_two(self):
+        """
+        This atomically applies custom_function2 to the contained value.
+        When sharded it is applied to the shard of the calling thread, which is only equivalent while it adds a constant.
+        """
+        cdef int *p = self.shard()
+        cdef int old = atomic_load(p)
+
+        while not atomic_cas(p, old, _module2.custom_function2(old)):
+            old = atomic_load(p)
+
+    cpdef void add_many(self, const int[:] values):
+        """
+        This adds every integer of a buffer to the contained value without holding the GIL, with a single atomic update.
+        """
+        cdef Py_ssize_t i
+        cdef int x = 0
+
+        # cpdef arguments cannot be declared "not None", and release builds skip initializedcheck
+        if values is None:
+            raise TypeError("values must be a buffer, not None")
+
+        with nogil:
+            for i in range(values.shape[0]):
+                x += values[i]
+            atomic_add(self.shard(), x)
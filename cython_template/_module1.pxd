@@ -2,4 +2,19 @@ cdef class Class1:
     cdef int x
     cdef private_method(self)
     cpdef int add(self, int x)
-    cpdef int add_two(self)
\ No newline at end of file
+    cpdef int add_two(self)
+    cpdef int add_many(self, const int[:] values, int[:] totals=*)
+
+cdef class Class1Array:
+    cdef int *data
+    cdef Py_ssize_t size
+    cdef object mapping
+    cdef object view
+    cdef Py_ssize_t exports
+    cdef Py_ssize_t shape[1]
+    cdef Py_ssize_t strides[1]
+    cdef allocate(self, Py_ssize_t size)
+    cdef Py_ssize_t checked_index(self, Py_ssize_t i) except -1
+    cdef check_subset(self, const unsigned char[:] mask, const Py_ssize_t[:] indices)
+    cpdef void add(self, int x, const unsigned char[:] mask=*, const Py_ssize_t[:] indices=*)
+    cpdef void add_two(self, const unsigned char[:] mask=*, const Py_ssize_t[:] indices=*)
@@ -1,9 +1,18 @@
+cimport cython
+from cpython.buffer cimport PyBUF_FORMAT
+from cpython.mem cimport PyMem_Calloc, PyMem_Free
+
 from . cimport _module2
 
+import mmap
+import os
+
 
+@cython.freelist(64)
 cdef class Class1:
     """
     This is a docstring for the entire class.
+    Freed instances are kept on a freelist and reused, which makes short lived instances cheap.
     """
 
     cdef private_method(self):
@@ -14,7 +23,7 @@ cdef class Class1:
 
     def __init__(self):
         """
-        This is the __init__ method.
+        This is the __init__ method, it takes no arguments and resets the contained value.
         """
         self.private_method()
     
@@ -31,3 +40,240 @@ cdef class Class1:
         """
         self.x = _module2.custom_function2(self.x)
         return self.x
+    
+    cpdef int add_many(self, const int[:] values, int[:] totals=None):
+        """
+        This adds every integer of a buffer to the contained value, and returns the new integer.
+        If totals is given, it receives the running value after each addition.
+        """
+        cdef Py_ssize_t i, n
+        cdef int x = self.x
+        cdef bint running = totals is not None
+
+        # cpdef arguments cannot be declared "not None", and release builds skip initializedcheck
+        if values is None:
+            raise TypeError("values must be a buffer, not None")
+
+        n = values.shape[0]
+        if running and totals.shape[0] < n:
+            raise ValueError("totals is shorter than values")
+
+        with nogil:
+            if running:
+                for i in range(n):
+                    x += values[i]
+                    totals[i] = x
+            else:
+                for i in range(n):
+                    x += values[i]
+
+        self.x = x
+        return self.x
+
+
+def new_class1_list(Py_ssize_t n):
+    """
+    This creates a list of n zeroed Class1 instances in one call, faster than calling Class1() n times.
+    """
+    if n < 0:
+        raise ValueError("n must not be negative")
+    return [Class1.__new__(Class1) for _ in range(n)]
+
+
+cdef class Class1Array:
+    """
+    This is a collection of counters stored in one contiguous C array of ints, one Class1 value each.
+    It exposes the counters through the buffer protocol, e.g. memoryview(counters) or numpy.asarray(counters).
+    Use map_class1_array for counters that live in a file.
+    """
+
+    def __cinit__(self, Py_ssize_t size):
+        if size < 0:
+            raise ValueError("size must not be negative")
+
+        self.allocate(size)
+
+    def __dealloc__(self):
+        if self.mapping is None:
+            PyMem_Free(self.data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    cdef allocate(self, Py_ssize_t size):
+        self.data = <int *> PyMem_Calloc(size if size else 1, sizeof(int))
+        if self.data == NULL:
+            raise MemoryError()
+        self.size = size
+
+    @property
+    def mapped(self):
+        """
+        Whether the counters live in a memory mapped file.
+        """
+        return self.mapping is not None
+
+    def flush(self, Py_ssize_t start=0, Py_ssize_t stop=-1):
+        """
+        This writes the counters in [start, stop) of a memory mapped array back to its file, stop=-1 flushes to the end.
+        Only the pages holding those counters are written. Does nothing for arrays that are not mapped.
+        """
+        cdef Py_ssize_t offset
+
+        if self.mapping is None or self.size == 0:
+            return
+        if stop < 0 or stop > self.size:
+            stop = self.size
+        if start < 0 or start >= stop:
+            return
+
+        # flush offsets must be a multiple of the allocation granularity
+        offset = start * sizeof(int)
+        offset -= offset % mmap.ALLOCATIONGRANULARITY
+        self.mapping.flush(offset, stop * sizeof(int) - offset)
+
+    def close(self):
+        """
+        This flushes and unmaps a memory mapped array, which is empty afterwards.
+        Raises BufferError while buffers exported from the array are still alive.
+        """
+        if self.mapping is None:
+            return
+        if self.exports:
+            raise BufferError("cannot close a Class1Array with exported buffers")
+
+        self.flush()
+        self.view = None
+        self.mapping.close()
+        self.mapping = None
+        self.allocate(0)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, Py_ssize_t i):
+        return self.data[self.checked_index(i)]
+
+    def __setitem__(self, Py_ssize_t i, int x):
+        self.data[self.checked_index(i)] = x
+
+    def __getbuffer__(self, Py_buffer *buffer, int flags):
+        self.shape[0] = self.size
+        self.strides[0] = sizeof(int)
+
+        buffer.buf = self.data
+        buffer.obj = self
+        buffer.len = self.size * sizeof(int)
+        buffer.itemsize = sizeof(int)
+        buffer.readonly = 0
+        buffer.ndim = 1
+        buffer.format = NULL
+        if flags & PyBUF_FORMAT:
+            buffer.format = "i"
+        buffer.shape = self.shape
+        buffer.strides = self.strides
+        buffer.suboffsets = NULL
+        buffer.internal = NULL
+        self.exports += 1
+
+    def __releasebuffer__(self, Py_buffer *buffer):
+        self.exports -= 1
+
+    cdef Py_ssize_t checked_index(self, Py_ssize_t i) except -1:
+        if i < 0:
+            i += self.size
+        if i < 0 or i >= self.size:
+            raise IndexError("Class1Array index out of range")
+        return i
+
+    cdef check_subset(self, const unsigned char[:] mask, const Py_ssize_t[:] indices):
+        cdef Py_ssize_t i
+
+        if mask is not None and indices is not None:
+            raise ValueError("pass either mask or indices, not both")
+        if mask is not None and mask.shape[0] != self.size:
+            raise ValueError("mask length does not match the number of counters")
+        if indices is not None:
+            for i in range(indices.shape[0]):
+                if indices[i] < 0 or indices[i] >= self.size:
+                    raise IndexError("Class1Array index out of range")
+
+    cpdef void add(self, int x, const unsigned char[:] mask=None, const Py_ssize_t[:] indices=None):
+        """
+        This adds an integer to every counter, or only to those selected by a mask or an array of indices.
+        """
+        cdef Py_ssize_t i
+        cdef int *data = self.data
+
+        self.check_subset(mask, indices)
+
+        with nogil:
+            if indices is not None:
+                for i in range(indices.shape[0]):
+                    data[indices[i]] += x
+            elif mask is not None:
+                for i in range(self.size):
+                    if mask[i]:
+                        data[i] += x
+            else:
+                for i in range(self.size):
+                    data[i] += x
+
+    cpdef void add_two(self, const unsigned char[:] mask=None, const Py_ssize_t[:] indices=None):
+        """
+        This adds two to every counter, or only to those selected by a mask or an array of indices.
+        """
+        cdef Py_ssize_t i
+        cdef int *data = self.data
+
+        self.check_subset(mask, indices)
+
+        with nogil:
+            if indices is not None:
+                for i in range(indices.shape[0]):
+                    data[indices[i]] = _module2.custom_function2(data[indices[i]])
+            elif mask is not None:
+                for i in range(self.size):
+                    if mask[i]:
+                        data[i] = _module2.custom_function2(data[i])
+            else:
+                for i in range(self.size):
+                    data[i] = _module2.custom_function2(data[i])
+
+
+def map_class1_array(path, Py_ssize_t size=-1):
+    """
+    This opens the file at path as a Class1Array whose counters are the native ints stored in the file.
+    Changes are shared with every process mapping the same file and written back by flush or close.
+    size=-1 maps the whole file, otherwise the file is created or zero extended to hold size counters.
+    """
+    cdef Class1Array counters
+    cdef int[::1] view
+    cdef Py_ssize_t length, itemsize = sizeof(int)
+
+    fd = os.open(path, os.O_RDWR | (os.O_CREAT if size >= 0 else 0))
+    try:
+        length = os.fstat(fd).st_size
+        if size < 0:
+            size = length // itemsize
+        elif length < size * itemsize:
+            os.ftruncate(fd, size * itemsize)
+
+        counters = Class1Array(0)
+        if size == 0:
+            return counters
+
+        mapping = mmap.mmap(fd, size * itemsize)
+    finally:
+        os.close(fd)
+
+    view = memoryview(mapping).cast("i")
+    PyMem_Free(counters.data)
+    counters.data = &view[0]
+    counters.size = size
+    counters.mapping = mapping
+    counters.view = view
+    return counters
@@ -1 +1,2 @@
-cpdef int custom_function2(int x)
\ No newline at end of file
+cpdef int custom_function2(int x) noexcept nogil
+cpdef custom_function2_array(const int[:] values, int[:] out=*, bint parallel=*)
\ No newline at end of file
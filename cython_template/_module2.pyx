@@ -1,6 +1,49 @@
+# cython: freethreading_compatible=True
+# no mutable module state, _concurrent cimports this module and must not bring the GIL back on free-threaded builds
 
-cpdef int custom_function2(int x):
+from cpython cimport array
+from cython.parallel cimport prange
+
+import array
+
+# below this many elements custom_function2_array stays on one thread,
+# starting the OpenMP team costs more than the loop itself
+PARALLEL_THRESHOLD = 32768
+
+cdef array.array int_array_template = array.array("i")
+
+
+cpdef int custom_function2(int x) noexcept nogil:
     """
     This is a docstring. Adds two to an integer
     """
     return x + 2
+
+
+cpdef custom_function2_array(const int[:] values, int[:] out=None, bint parallel=True):
+    """
+    This applies custom_function2 to every integer of a buffer, and returns the output buffer.
+    The output is written to out if given (which may be values itself), otherwise to a new array('i').
+    Buffers with at least PARALLEL_THRESHOLD elements are split across threads unless parallel is False.
+    """
+    cdef Py_ssize_t i, n
+
+    # cpdef arguments cannot be declared "not None", and release builds skip initializedcheck
+    if values is None:
+        raise TypeError("values must be a buffer, not None")
+
+    n = values.shape[0]
+    if out is None:
+        out = array.clone(int_array_template, n, zero=False)
+    elif out.shape[0] < n:
+        raise ValueError("out is shorter than values")
+
+    if parallel and n >= PARALLEL_THRESHOLD:
+        for i in prange(n, nogil=True, schedule="static"):
+            out[i] = custom_function2(values[i])
+    else:
+        with nogil:
+            for i in range(n):
+                out[i] = custom_function2(values[i])
+
+    return out.base
@@ -0,0 +1,84 @@
+/*
+ * C API of cython_template for extensions that are not built against its .pxd files.
+ *
+ *     #include "cython_template_api.h"   (directory from cython_template.get_include())
+ *
+ *     static CythonTemplate_API *api;
+ *     ...
+ *     api = CythonTemplate_ImportAPI();   (with the GIL, e.g. in the module init)
+ *     if (api == NULL) return NULL;
+ *
+ *     PyObject *obj = api->class1_new();   (with the GIL, new reference)
+ *     Py_BEGIN_ALLOW_THREADS
+ *     api->class1_add(obj, 1);             (no GIL needed)
+ *     Py_END_ALLOW_THREADS
+ *
+ * class1_add, class1_add_two and class1_read take a borrowed reference to a Class1 instance,
+ * the caller has to keep it alive and check its type (PyObject_TypeCheck(obj, api->class1_type)).
+ * Like Class1 itself they are not atomic, concurrent updates of one instance need a lock.
+ */
+
+#ifndef CYTHON_TEMPLATE_API_H
+#define CYTHON_TEMPLATE_API_H
+
+#include <Python.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+#define CYTHON_TEMPLATE_API_CAPSULE "cython_template._capi._C_API"
+
+/* bumped on incompatible changes, new entries are only appended and keep the version */
+#define CYTHON_TEMPLATE_API_VERSION 1
+
+typedef struct {
+    int version;
+    /* sizeof(CythonTemplate_API) of the exporting build, entries past it are missing */
+    size_t size;
+
+    PyTypeObject *class1_type;
+
+    /* new zeroed Class1, NULL with an exception set on failure, needs the GIL */
+    PyObject *(*class1_new)(void);
+
+    /* Class1.add, Class1.add_two and the contained value, no GIL needed */
+    int (*class1_add)(PyObject *obj, int x);
+    int (*class1_add_two)(PyObject *obj);
+    int (*class1_read)(PyObject *obj);
+
+    /* _module2.custom_function2, no GIL needed */
+    int (*custom_function2)(int x);
+} CythonTemplate_API;
+
+/* imports cython_template._capi and returns its API table, NULL with an exception set on failure */
+static inline CythonTemplate_API *CythonTemplate_ImportAPI(void) {
+    /* PyCapsule_Import only getattrs below the package, which loads its submodules lazily */
+    PyObject *module = PyImport_ImportModule("cython_template._capi");
+    if (module == NULL) {
+        return NULL;
+    }
+    PyObject *capsule = PyObject_GetAttrString(module, "_C_API");
+    Py_DECREF(module);
+    if (capsule == NULL) {
+        return NULL;
+    }
+    /* the module keeps the capsule and the table alive */
+    CythonTemplate_API *api = (CythonTemplate_API *) PyCapsule_GetPointer(capsule, CYTHON_TEMPLATE_API_CAPSULE);
+    Py_DECREF(capsule);
+    if (api == NULL) {
+        return NULL;
+    }
+    if (api->version != CYTHON_TEMPLATE_API_VERSION || api->size < sizeof(CythonTemplate_API)) {
+        PyErr_Format(PyExc_ImportError, "cython_template C API version %d is not compatible with version %d",
+                     api->version, CYTHON_TEMPLATE_API_VERSION);
+        return NULL;
+    }
+    return api;
+}
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif /* CYTHON_TEMPLATE_API_H */
@@ -2,7 +2,22 @@
 This is a test script for using the test_cy Cython module
 """
 
-from cython_template import module1, module2
+import ast
+import ctypes
+import os
+import tempfile
+import threading
+from array import array
+from pathlib import Path
+
+from cython_template import _capi, concurrent, module1, module2
+from watch import dependency_graph, watched_files
+
+
+# generated stubs must be valid Python for type checkers
+
+for stub in Path(module1.__file__).parent.glob("*.pyi"):
+    ast.parse(stub.read_text(), filename=str(stub))
 
 
 # test access to private members
@@ -25,4 +40,131 @@ else:
 
 print(obj.add(1))
 print(obj.add_two())
+print(obj.add_many(array("i", [1, 2, 3])))
+
+try:
+    obj.add_many(None)
+except TypeError:
+    pass
+else:
+    assert False, "add_many should reject None"
 print(module2.custom_function2(2))
+print(list(module2.custom_function2_array(array("i", [1, 2, 3]))))
+
+try:
+    module2.custom_function2_array(None)
+except TypeError:
+    pass
+else:
+    assert False, "custom_function2_array should reject None"
+
+# bulk construction, instances skip __init__ but start zeroed, including those reused from the freelist
+
+instances = module1.new_class1_list(5)
+assert len(instances) == 5 and all(type(i) is module1.Class1 for i in instances)
+assert [i.add(0) for i in instances] == [0] * 5
+assert len({id(i) for i in instances}) == 5
+instances[0].add(3)
+del instances
+assert [i.add(0) for i in module1.new_class1_list(5)] == [0] * 5
+assert module1.new_class1_list(0) == []
+
+try:
+    module1.Class1(1)
+except TypeError:
+    pass
+else:
+    assert False, "Class1 takes no arguments"
+
+try:
+    concurrent.ConcurrentClass1().add_many(None)
+except TypeError:
+    pass
+else:
+    assert False, "ConcurrentClass1.add_many should reject None"
+
+counters = module1.Class1Array(4)
+counters.add(1)
+counters.add_two(mask=bytes([1, 0, 0, 1]))
+print(list(counters))
+
+# C API capsule, read and called through ctypes the way a C extension uses cython_template_api.h
+
+
+class CythonTemplateAPI(ctypes.Structure):
+    _fields_ = [
+        ("version", ctypes.c_int),
+        ("size", ctypes.c_size_t),
+        ("class1_type", ctypes.py_object),
+        ("class1_new", ctypes.PYFUNCTYPE(ctypes.py_object)),
+        ("class1_add", ctypes.CFUNCTYPE(ctypes.c_int, ctypes.py_object, ctypes.c_int)),
+        ("class1_add_two", ctypes.CFUNCTYPE(ctypes.c_int, ctypes.py_object)),
+        ("class1_read", ctypes.CFUNCTYPE(ctypes.c_int, ctypes.py_object)),
+        ("custom_function2", ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_int)),
+    ]
+
+
+get_pointer = ctypes.pythonapi.PyCapsule_GetPointer
+get_pointer.restype = ctypes.c_void_p
+get_pointer.argtypes = [ctypes.py_object, ctypes.c_char_p]
+api = CythonTemplateAPI.from_address(get_pointer(_capi._C_API, b"cython_template._capi._C_API"))
+
+assert api.version == 1 and api.size == ctypes.sizeof(CythonTemplateAPI)
+assert api.class1_type is module1.Class1
+
+# the CFUNCTYPE entries are called without the GIL
+obj = api.class1_new()
+assert (api.class1_add(obj, 3), api.class1_add_two(obj), api.class1_read(obj), obj.add(0)) == (3, 5, 5, 5)
+assert api.custom_function2(1) == module2.custom_function2(1)
+
+# memory mapped counters, written back to their file and mapped again
+
+with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, "counters.bin")
+
+    with module1.map_class1_array(path, 4) as mapped:
+        assert mapped.mapped and list(mapped) == [0, 0, 0, 0]
+        mapped.add(1)
+        mapped[-1] = 7
+        mapped.flush(0, 2)
+
+        # an exported buffer keeps the mapping open
+        exported = memoryview(mapped)
+        try:
+            mapped.close()
+        except BufferError:
+            pass
+        else:
+            assert False, "close should fail while a buffer is exported"
+        exported.release()
+
+    assert not mapped.mapped and len(mapped) == 0
+    assert os.path.getsize(path) == 4 * array("i").itemsize
+
+    with module1.map_class1_array(path) as reopened:
+        assert list(reopened) == [1, 1, 1, 7]
+
+# concurrent updates from several threads, none may be lost
+
+
+def update(counter, values):
+    for _ in range(1000):
+        counter.add(1)
+    counter.add_many(values)
+
+
+for shards in (1, 4):
+    counter = concurrent.ConcurrentClass1(shards)
+    threads = [threading.Thread(target=update, args=(counter, array("i", [1] * 1000))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value == 4 * 2000, counter.value
+
+# watch mode rebuilds the dependents of a changed .pxd
+
+graph = dependency_graph(watched_files())
+assert graph["cython_template._module1"] == {"cython_template._module2"}, graph
+assert graph["cython_template._concurrent"] == {"cython_template._module2"}, graph
+assert graph["cython_template._capi"] == {"cython_template._module1", "cython_template._module2"}, graph
@@ -0,0 +1,112 @@
+"""
+Profile a workload of the cython_template extensions and print the hot paths.
+
+The extensions have to be built with the trace profile, otherwise cProfile only sees the
+Python code calling them:
+
+    python setup.py build_ext --inplace --build-profile trace
+    python profile_workload.py
+    python profile_workload.py --script main.py --sort cumulative
+    python profile_workload.py --lines
+
+--lines reports per line timings of the hot extension functions, it needs line_profiler
+(pip install line_profiler).
+"""
+
+import argparse
+import cProfile
+import io
+import pstats
+import runpy
+import sys
+from pathlib import Path
+
+from cython_template import module1, module2
+
+
+def workload(iterations: int):
+    """
+    Exercises Class1.add, Class1.add_two and custom_function2 from Python
+    """
+    obj = module1.Class1()
+    for _ in range(iterations):
+        obj.add(1)
+        obj.add_two()
+
+    for i in range(iterations):
+        module2.custom_function2(i)
+
+    counters = module1.Class1Array(1000)
+    for _ in range(iterations // 100):
+        counters.add(1)
+        counters.add_two()
+
+
+def build_profile() -> str:
+    try:
+        from cython_template import _build_info
+    except ImportError:
+        return "unknown"
+    return _build_info.PROFILE
+
+
+def run(args: argparse.Namespace):
+    if args.script:
+        runpy.run_path(str(args.script), run_name="__main__")
+    else:
+        workload(args.iterations)
+
+
+def profile_functions(args: argparse.Namespace):
+    profiler = cProfile.Profile()
+    profiler.runcall(run, args)
+
+    if args.output:
+        profiler.dump_stats(args.output)
+
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats(args.sort).print_stats(args.limit)
+    print(out.getvalue())
+
+
+def profile_lines(args: argparse.Namespace):
+    try:
+        from line_profiler import LineProfiler
+    except ImportError:
+        sys.exit("--lines needs line_profiler, pip install line_profiler")
+
+    profiler = LineProfiler(
+        module1.Class1.add,
+        module1.Class1.add_two,
+        module2.custom_function2,
+        module1.Class1Array.add,
+        module1.Class1Array.add_two,
+    )
+    profiler.runcall(run, args)
+    profiler.print_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--script", type=Path, help="profile this script instead of the built in workload")
+    parser.add_argument("--iterations", type=int, default=100_000, help="size of the built in workload")
+    parser.add_argument("--sort", default="tottime", help="pstats sort key, e.g. tottime, cumulative, ncalls")
+    parser.add_argument("--limit", type=int, default=20, help="number of functions in the report")
+    parser.add_argument("--output", type=Path, help="also write the raw cProfile stats here (for snakeviz, gprof2dot, ...)")
+    parser.add_argument("--lines", action="store_true", help="per line timings with line_profiler")
+    args = parser.parse_args()
+
+    profile = build_profile()
+    if profile != "trace":
+        print(f"warning: the extensions were built with the {profile} profile, rebuild with --build-profile trace "
+              "to see inside them", file=sys.stderr)
+
+    if args.lines:
+        profile_lines(args)
+    else:
+        profile_functions(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,109 @@
-import logging
+import json
+import os
 from pathlib import Path
-from setuptools import find_packages, setup, Extension
 
-from Cython.Build import cythonize
-from _cython_peg import cython_string_2_stub
+from setuptools import find_packages, setup
+from setuptools.command.build_ext import build_ext as _build_ext
+from setuptools.errors import SetupError
 
-src_dir = Path(__file__).parent.joinpath("cython_template")
+from _build_config import (
+    active_profile,
+    build_info,
+    build_profiles,
+    cythonize_extensions,
+    default_workers,
+    find_cython_files,
+    make_extension,
+    src_dir,
+)
+
+cython_files = find_cython_files()
 
-cython_files = list(src_dir.rglob("*.pyx"))
+# parallel stub generation, cythonize and C compilation, set CYTHON_TEMPLATE_JOBS to override
+workers = default_workers()
 
 
-def path_as_module_name(script_path: Path) -> str:
+class build_ext(_build_ext):
     """
-    Convert a path to a module name
+    build_ext that cythonizes with the selected build profile and regenerates the stub files before compiling
     """
-    return script_path.relative_to(src_dir.parent).with_suffix("").as_posix().replace("/", ".")
 
+    user_options = _build_ext.user_options + [
+        ("build-profile=", None, f"one of {', '.join(build_profiles())} (default: $CYTHON_TEMPLATE_PROFILE or release)"),
+        ("annotate", None, "write the Cython annotation HTML and annotation_summary.json (or set CYTHON_TEMPLATE_ANNOTATE=1)"),
+        ("annotate-budget=", None, "fail when a function has more Python interacting lines than this JSON budget allows (implies --annotate)"),
+    ]
+    boolean_options = _build_ext.boolean_options + ["annotate"]
 
-extensions = [
-    Extension(
-        name=path_as_module_name(f),
-        sources=[str(f)],
-    )
-    for f in cython_files
-]
+    def initialize_options(self):
+        super().initialize_options()
+        self.build_profile = None
+        self.annotate = None
+        self.annotate_budget = None
 
+    def finalize_options(self):
+        self.profile = active_profile(self.build_profile)
+        self.build_info = build_info(self.profile)
 
-# generate stub files
-for f in cython_files:
-    input_text = f.read_text()
-    stub, unparsed = cython_string_2_stub(input_text)
+        if self.annotate is None:
+            self.annotate = os.environ.get("CYTHON_TEMPLATE_ANNOTATE", "0") not in ("", "0")
+        self.annotate = bool(self.annotate or self.annotate_budget)
 
-    if unparsed:
-        logging.warning(f"Unparsed input in {f}, starting at character {len(input_text)-len(unparsed)}")
-    
-    with open(f.with_suffix(".pyi"), mode="w") as fi:
-        fi.write(stub)
+        # the generated C and the objects only depend on the sources, a different profile has to rebuild both
+        info_path = src_dir.joinpath("_build_info.py")
+        changed = not info_path.exists() or info_path.read_text() != self.build_info
 
+        # cythonize only checks the .c files, annotations are missing for sources it skips
+        stale_annotation = self.annotate and any(
+            not f.with_suffix(".html").exists() or f.with_suffix(".html").stat().st_mtime < f.stat().st_mtime
+            for f in cython_files
+        )
 
-setup(
-    name="cython_template",
-    ext_modules=cythonize(extensions, language_level="3"),
-    packages=find_packages(),
-)
+        extensions = [make_extension(f, self.profile) for f in cython_files]
+        self.distribution.ext_modules = cythonize_extensions(
+            extensions, workers=workers, profile=self.profile, force=changed or stale_annotation, annotate=self.annotate,
+        )
+        if changed:
+            self.force = 1
+
+        super().finalize_options()
+
+    def check_annotation(self):
+        from _annotate import annotation_summary, check_budget, load_budget
+
+        summary = annotation_summary(cython_files)
+        summary_path = Path("annotation_summary.json")
+        summary_path.write_text(json.dumps(summary, indent=1) + "\n")
+        print(f"annotation summary written to {summary_path}, HTML next to each .pyx")
+
+        if self.annotate_budget:
+            violations = check_budget(summary, load_budget(Path(self.annotate_budget)))
+            if violations:
+                raise SetupError("Python interaction budget exceeded:\n" + "\n".join(f"  {v}" for v in violations))
+
+    def run(self):
+        # imported here so that commands which never build (clean, sdist, ...) skip loading the stub generator
+        from _stubgen import generate_stub_files, write_if_changed
+
+        generate_stub_files(cython_files, workers=workers)
+        if self.annotate:
+            self.check_annotation()
+        super().run()
+
+        # recorded once the extensions are built, so a failed build is retried with force
+        write_if_changed(src_dir.joinpath("_build_info.py"), self.build_info)
+        if not self.inplace:
+            self.mkpath(f"{self.build_lib}/{src_dir.name}")
+            write_if_changed(Path(self.build_lib, src_dir.name, "_build_info.py"), self.build_info)
+
+
+# with the spawn start method (macOS, Windows) every worker process imports this file again, it must not run setup
+if __name__ == "__main__":
+    setup(
+        name="cython_template",
+        ext_modules=[make_extension(f) for f in cython_files],
+        options={"build_ext": {"parallel": workers}},
+        cmdclass={"build_ext": build_ext},
+        packages=find_packages(),
+        package_data={"cython_template": ["cython_template_api.h"]},
+    )
@@ -0,0 +1,145 @@
+"""
+Watch the cython_template sources and incrementally rebuild in place.
+
+Changing a .pyx or .pxd recompiles its extension and regenerates its stub, changing a .pxd
+also recompiles every extension that (transitively) cimports it.
+
+    python watch.py
+"""
+
+import argparse
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Set
+
+from setuptools import Distribution
+
+from _build_config import cythonize_extensions, default_workers, make_extension, path_as_module_name, src_dir
+from _stubgen import generate_stub_files
+
+# an unparenthesized name list ends at its line, a parenthesized one may span lines
+FROM_CIMPORT = re.compile(r"^[ \t]*from[ \t]+(\.*)([\w.]*)[ \t]+cimport[ \t]+(?:\(([^)]*)|([^#\n]*))", re.MULTILINE)
+CIMPORT = re.compile(r"^[ \t]*cimport[ \t]+([^#\n]*)", re.MULTILINE)
+
+
+def watched_files() -> Dict[Path, float]:
+    return {f: f.stat().st_mtime for suffix in ("*.pyx", "*.pxd") for f in src_dir.rglob(suffix)}
+
+
+def cimported_modules(path: Path, modules: Set[str]) -> Set[str]:
+    """
+    Modules of this package cimported by a .pyx or .pxd file
+    """
+    package = path_as_module_name(path).rsplit(".", 1)[0]
+    text = path.read_text()
+    candidates = []
+
+    for dots, name, parenthesized, names in FROM_CIMPORT.findall(text):
+        names = parenthesized or names
+        if dots:
+            base = ".".join(package.split(".")[: len(package.split(".")) - len(dots) + 1])
+            name = f"{base}.{name}" if name else base
+        candidates.append(name)
+        candidates.extend(f"{name}.{n.split()[0]}" for n in names.split(",") if n.strip())
+
+    for names in CIMPORT.findall(text):
+        candidates.extend(n.split()[0] for n in names.split(",") if n.strip())
+
+    return {c for c in candidates if c in modules}
+
+
+def dependency_graph(files: Iterable[Path]) -> Dict[str, Set[str]]:
+    """
+    module name -> modules whose .pxd it depends on
+    """
+    files = list(files)
+    modules = {path_as_module_name(f) for f in files}
+    graph = {m: set() for m in modules}
+    for f in files:
+        graph[path_as_module_name(f)] |= cimported_modules(f, modules)
+    return graph
+
+
+def affected_modules(changed: Iterable[Path], graph: Dict[str, Set[str]]) -> Set[str]:
+    """
+    Modules to rebuild: those with a changed file, plus dependents of changed .pxd files
+    """
+    affected = set()
+    pending = []
+    for f in changed:
+        module = path_as_module_name(f)
+        affected.add(module)
+        if f.suffix == ".pxd":
+            pending.append(module)
+
+    while pending:
+        module = pending.pop()
+        for dependent, dependencies in graph.items():
+            if module in dependencies and dependent not in affected:
+                affected.add(dependent)
+                pending.append(dependent)
+
+    return affected
+
+
+def rebuild(changed: List[Path], workers: int):
+    graph = dependency_graph(watched_files())
+    modules = affected_modules(changed, graph)
+    sources = [f for f in sorted(src_dir.rglob("*.pyx")) if path_as_module_name(f) in modules]
+
+    print(f"[watch] changed: {', '.join(str(f.relative_to(src_dir.parent)) for f in changed)}")
+    print(f"[watch] rebuilding: {', '.join(sorted(path_as_module_name(f) for f in sources)) or 'nothing'}")
+
+    start = time.perf_counter()
+    stubbed = sorted({f.with_suffix(".pyx") for f in changed if f.with_suffix(".pyx").exists()})
+    generate_stub_files(stubbed, workers=workers)
+    print(f"[watch] stubs     {time.perf_counter() - start:.2f}s")
+
+    if not sources:
+        return
+
+    start = time.perf_counter()
+    extensions = cythonize_extensions([make_extension(f) for f in sources], workers=workers, force=True)
+    print(f"[watch] cythonize {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    dist = Distribution({"name": "cython_template", "ext_modules": extensions})
+    build_ext = dist.get_command_obj("build_ext")
+    build_ext.inplace = 1
+    build_ext.parallel = workers
+    build_ext.ensure_finalized()
+    build_ext.run()
+    print(f"[watch] compile   {time.perf_counter() - start:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between polls")
+    parser.add_argument("--jobs", type=int, default=default_workers(), help="stub and compile workers")
+    args = parser.parse_args()
+
+    mtimes = watched_files()
+    print(f"[watch] watching {len(mtimes)} files in {src_dir}")
+
+    while True:
+        time.sleep(args.interval)
+        current = watched_files()
+        changed = sorted(f for f, mtime in current.items() if mtimes.get(f) != mtime)
+        mtimes = current
+
+        if not changed:
+            continue
+
+        try:
+            rebuild(changed, args.jobs)
+        except Exception as e:
+            # keep watching, the next save usually fixes the error
+            print(f"[watch] build failed: {e}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass